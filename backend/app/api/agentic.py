@@ -364,7 +364,7 @@ async def get_prediction_history(limit: int = 20):
                 agent_result = await agent.run(correlated_data)
                 
                 # Extract predicted systems from alerts
-                predicted_systems = list(set([alert.system for alert in client_alerts]))
+                predicted_systems = list({alert.system for alert in client_alerts})
                 
                 # Format for frontend
                 formatted_predictions.append({
@@ -289,7 +289,7 @@ async def get_deduplication_summary():
         
         all_alerts = generate_mock_alerts()
         dedup_engine = AlertDeduplicationEngine(time_window_minutes=5)
-        result = dedup_engine.deduplicate_alerts(all_alerts)
+        result = dedup_engine.deduplicate_alerts(all_alerts, return_alerts=False)
         
         return {
             "before": {
@@ -119,7 +119,7 @@ async def make_batch_decisions(
         # Limit to max_decisions
         filtered_alerts = filtered_alerts[:max_decisions]
         
-        decisions = []
+        contexts = []
         
         for alert in filtered_alerts:
             client = next((c for c in MOCK_CLIENTS if c.id == alert.client_id), None)
@@ -127,7 +127,7 @@ async def make_batch_decisions(
                 continue
             
             # Create context
-            context = DecisionContext(
+            contexts.append(DecisionContext(
                 alert=alert,
                 client=client,
                 related_alerts=[],
@@ -135,11 +135,14 @@ async def make_batch_decisions(
                 business_hours=True,
                 client_tier=client.tier,
                 current_load=75.0
-            )
-            
-            # Make decision
-            decision = await decision_agent.make_decision(context)
-            
+            ))
+        
+        # Make decisions (scored as one batch, LLM reasoning runs concurrently)
+        batch_results = await decision_agent.make_decisions(contexts)
+        
+        decisions = []
+        for context, decision in zip(contexts, batch_results):
+            alert = context.alert
             decisions.append({
                 "alert_id": alert.id,
                 "client_id": alert.client_id,
@@ -245,7 +248,7 @@ async def get_decision_stats() -> Dict:
             },
             "capabilities": {
                 "deterministic_scoring": True,
-                "ml_decision_prediction": True,
+                "rule_table_decisions": True,
                 "llm_reasoning": decision_agent.llm_available,
                 "business_impact_analysis": True,
                 "cost_impact_assessment": True,
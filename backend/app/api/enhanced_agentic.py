@@ -160,7 +160,7 @@ async def get_enhanced_agent_insights():
             "patterns_learned": len(agent.pattern_effectiveness),
             "performance_metrics": agent.performance_metrics,
             "cross_client_insights": agent._get_cross_client_insights(),
-            "recent_incidents": agent.incident_memory[-5:] if agent.incident_memory else [],
+            "recent_incidents": agent.recent_incidents(5),
             "pattern_effectiveness": agent._get_cross_client_insights().get("most_common_patterns", []),
             "enhanced_features": {
                 "comprehensive_data_collection": True,
@@ -279,7 +279,7 @@ async def get_enhanced_prediction_history(limit: int = 10):
     try:
         agent = get_enhanced_cascade_agent()
         return {
-            "prediction_history": agent.incident_memory[-limit:] if agent.incident_memory else [],
+            "prediction_history": agent.recent_incidents(limit),
             "total_predictions": len(agent.incident_memory),
             "performance_summary": {
                 "average_confidence": agent.performance_metrics.get("average_confidence", 0),
@@ -511,7 +511,7 @@ async def get_strands_agent_insights():
             "successful_analyses": agent.performance_metrics.get("successful_analyses", 0),
             "average_execution_time_ms": agent.performance_metrics.get("average_execution_time_ms", 0),
             "strand_success_rates": agent.strand_performance,
-            "recent_incidents": agent.incident_memory[-5:] if agent.incident_memory else [],
+            "recent_incidents": agent.recent_incidents(5),
             "strands_effectiveness": {
                 "most_reliable_strand": max(agent.strand_performance.items(), key=lambda x: x[1]["successful"] / max(1, x[1]["total"])) if agent.strand_performance else None,
                 "strands_used": len(agent.strand_performance),
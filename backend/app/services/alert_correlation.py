@@ -1,6 +1,42 @@
-from typing import List, Dict, Tuple
+import re
+from typing import List, Dict, Tuple, Optional
+from collections import Counter
 from datetime import datetime, timedelta
-from app.models.alert import Alert, AlertCorrelation
+from functools import lru_cache
+from app.models.alert import Alert, AlertCategory, AlertCorrelation, SeverityLevel
+
+@lru_cache(maxsize=4096)
+def _message_tokens(message: str) -> frozenset:
+    """Lowercased token set of a message, shared across all pair comparisons"""
+    return frozenset(message.lower().split())
+
+# Systems that typically fail together
+RELATED_SYSTEM_GROUPS = [
+    ["database", "web-app", "api-gateway"],
+    ["email-server", "file-server", "backup-system"],
+    ["network-gateway", "firewall", "load-balancer"],
+    ["storage-server", "backup-system", "file-server"]
+]
+
+# Every (system, system) pair that shares a group, folded once at import
+RELATED_SYSTEM_PAIRS = frozenset(
+    (system1, system2)
+    for group in RELATED_SYSTEM_GROUPS
+    for system1 in group
+    for system2 in group
+)
+
+# Correlation score weights
+TIME_WINDOW_SECONDS = 600  # 10 minutes
+TIME_WEIGHT = 0.4
+CLIENT_WEIGHT = 0.3
+SAME_SYSTEM_WEIGHT = 0.4
+RELATED_SYSTEM_WEIGHT = 0.2
+CATEGORY_WEIGHT = 0.2
+MESSAGE_WEIGHT = 0.3
+
+# Pairs scoring above this are correlated
+CORRELATION_THRESHOLD = 0.6
 
 class AlertCorrelationEngine:
     def __init__(self):
@@ -14,6 +50,15 @@ class AlertCorrelationEngine:
             "cache cleared"
         ]
         
+        # Successful operations are usually not critical
+        self.success_indicators = ["completed", "successful", "ok", "normal", "restored"]
+        
+        # One alternation scans each message once for every noise substring
+        self._noise_re = re.compile(
+            "|".join(map(re.escape, self.noise_patterns + self.success_indicators)),
+            re.IGNORECASE
+        )
+        
         self.duplicate_keywords = [
             ["cpu", "processor", "high usage"],
             ["memory", "ram", "out of memory"],
@@ -21,6 +66,14 @@ class AlertCorrelationEngine:
             ["network", "connection", "timeout"],
             ["database", "sql", "query"]
         ]
+        
+        # Flattened keyword -> group index so a message is scanned once
+        self._kw_to_group = {
+            tuple(kw.split()): group_id
+            for group_id, group in enumerate(self.duplicate_keywords)
+            for kw in group
+        }
+        self._max_kw_len = max(len(kw) for kw in self._kw_to_group)
     
     def filter_noise_alerts(self, alerts: List[Alert]) -> Tuple[List[Alert], List[Alert]]:
         """Separate critical alerts from noise"""
@@ -40,6 +93,8 @@ class AlertCorrelationEngine:
         """Find related alerts and group them"""
         correlations = []
         processed_alerts = set()
+        # Epoch seconds computed once; pair scoring only subtracts floats
+        epochs = [alert.timestamp.timestamp() for alert in alerts]
         
         for i, primary_alert in enumerate(alerts):
             if primary_alert.id in processed_alerts:
@@ -49,9 +104,11 @@ class AlertCorrelationEngine:
             
             for j, candidate_alert in enumerate(alerts):
                 if i != j and candidate_alert.id not in processed_alerts:
-                    correlation_score = self._calculate_correlation_score(primary_alert, candidate_alert)
+                    correlation_score = self._calculate_correlation_score(
+                        primary_alert, candidate_alert, time_diff=abs(epochs[i] - epochs[j])
+                    )
                     
-                    if correlation_score > 0.6:
+                    if correlation_score > CORRELATION_THRESHOLD:
                         related_alerts.append(candidate_alert.id)
                         processed_alerts.add(candidate_alert.id)
             
@@ -70,79 +127,81 @@ class AlertCorrelationEngine:
         return correlations
     
     def _is_noise_alert(self, alert: Alert) -> bool:
-        message_lower = alert.message.lower()
-        
-        # Check against known noise patterns
-        for pattern in self.noise_patterns:
-            if pattern in message_lower:
-                return True
-        
         # Check severity and category
-        if alert.severity == "info" and alert.category not in ["security", "performance"]:
+        if alert.severity is SeverityLevel.INFO and alert.category not in (AlertCategory.SECURITY, AlertCategory.PERFORMANCE):
             return True
         
-        # Check for successful operations (usually not critical)
-        success_indicators = ["completed", "successful", "ok", "normal", "restored"]
-        if any(indicator in message_lower for indicator in success_indicators):
+        # Check against known noise patterns and successful operations
+        if self._noise_re.search(alert.message):
             return True
         
         return False
     
-    def _calculate_correlation_score(self, alert1: Alert, alert2: Alert) -> float:
+    def _calculate_correlation_score(self, alert1: Alert, alert2: Alert, time_diff: Optional[float] = None) -> float:
         score = 0.0
         
         # Time proximity (alerts within 10 minutes get higher score)
-        time_diff = abs((alert1.timestamp - alert2.timestamp).total_seconds())
-        if time_diff <= 600:  # 10 minutes
-            score += 0.4 * (1 - time_diff / 600)
+        if time_diff is None:
+            time_diff = abs((alert1.timestamp - alert2.timestamp).total_seconds())
+        if time_diff <= TIME_WINDOW_SECONDS:
+            score += TIME_WEIGHT * (1 - time_diff / TIME_WINDOW_SECONDS)
         
         # Same client
         if alert1.client_id == alert2.client_id:
-            score += 0.3
+            score += CLIENT_WEIGHT
         
         # Same or related systems
         if alert1.system == alert2.system:
-            score += 0.4
-        elif self._are_related_systems(alert1.system, alert2.system):
-            score += 0.2
+            score += SAME_SYSTEM_WEIGHT
+        elif (alert1.system, alert2.system) in RELATED_SYSTEM_PAIRS:
+            score += RELATED_SYSTEM_WEIGHT
         
         # Same category
         if alert1.category == alert2.category:
-            score += 0.2
+            score += CATEGORY_WEIGHT
+        
+        # The message term adds at most MESSAGE_WEIGHT; skip the Jaccard when the
+        # pair cannot reach the threshold (the returned score is then a lower bound)
+        if score + MESSAGE_WEIGHT <= CORRELATION_THRESHOLD:
+            return score
         
         # Similar message content
         similarity = self._calculate_message_similarity(alert1.message, alert2.message)
-        score += similarity * 0.3
+        score += similarity * MESSAGE_WEIGHT
         
         return min(score, 1.0)
     
     def _are_related_systems(self, system1: str, system2: str) -> bool:
         """Check if two systems are typically related"""
-        related_groups = [
-            ["database", "web-app", "api-gateway"],
-            ["email-server", "file-server", "backup-system"],
-            ["network-gateway", "firewall", "load-balancer"],
-            ["storage-server", "backup-system", "file-server"]
-        ]
-        
-        for group in related_groups:
-            if system1 in group and system2 in group:
-                return True
-        
-        return False
+        return (system1, system2) in RELATED_SYSTEM_PAIRS
     
     def _calculate_message_similarity(self, message1: str, message2: str) -> float:
         """Simple keyword-based similarity calculation"""
-        words1 = set(message1.lower().split())
-        words2 = set(message2.lower().split())
+        words1 = _message_tokens(message1)
+        words2 = _message_tokens(message2)
         
         if not words1 or not words2:
             return 0.0
         
-        intersection = words1.intersection(words2)
-        union = words1.union(words2)
+        intersection = len(words1 & words2)
+        union = len(words1) + len(words2) - intersection
+        
+        return intersection / union if union else 0.0
+    
+    def _dominant_keyword_group(self, message: str) -> Optional[int]:
+        """Return the duplicate-keyword group with at least two hits in the message"""
+        tokens = message.lower().split()
+        hits = Counter()
+        for start in range(len(tokens)):
+            for length in range(1, min(self._max_kw_len, len(tokens) - start) + 1):
+                group_id = self._kw_to_group.get(tuple(tokens[start:start + length]))
+                if group_id is not None:
+                    hits[group_id] += 1
         
-        return len(intersection) / len(union) if union else 0.0
+        if not hits:
+            return None
+        group_id, count = hits.most_common(1)[0]
+        return group_id if count >= 2 else None
     
     def _determine_correlation_type(self, primary_alert: Alert, related_alerts: List[Alert]) -> str:
         """Determine the type of correlation between alerts"""
@@ -152,8 +211,11 @@ class AlertCorrelationEngine:
         if "warning" in severities and "critical" in severities:
             return "cascade"
         
-        # Check for duplicates (very similar messages)
+        # Check for duplicates (same dominant keyword group or very similar messages)
+        primary_group = self._dominant_keyword_group(primary_alert.message)
         for related_alert in related_alerts:
+            if primary_group is not None and self._dominant_keyword_group(related_alert.message) == primary_group:
+                return "duplicate"
             similarity = self._calculate_message_similarity(primary_alert.message, related_alert.message)
             if similarity > 0.8:
                 return "duplicate"
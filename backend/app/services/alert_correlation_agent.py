@@ -1,7 +1,9 @@
 import asyncio
+import hashlib
 import json
 import logging
 import uuid
+from collections import OrderedDict
 from typing import List, Dict, Optional, Tuple
 from datetime import datetime, timedelta
 import numpy as np
@@ -22,6 +24,26 @@ except ImportError:
     pipeline = None
     HuggingFacePipeline = None
 
+try:
+    from scipy import sparse
+    from scipy.linalg.blas import sgemm
+    from sklearn.feature_extraction.text import HashingVectorizer
+    from sklearn.preprocessing import normalize
+    SKLEARN_AVAILABLE = True
+except ImportError:
+    SKLEARN_AVAILABLE = False
+    sparse = None
+    sgemm = None
+    HashingVectorizer = None
+    normalize = None
+
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+    faiss = None
+
 from app.models.alert import Alert
 
 # Configure logging
@@ -43,6 +65,10 @@ Rules:
 - Keep only the top 10 clusters by severity.
 """
 
+# Maximum number of alert-text embeddings kept in the LRU cache
+EMBEDDING_CACHE_SIZE = 50000
+SUMMARY_CACHE_SIZE = 256
+
 class AlertCorrelationAgent:
     """
     Alert Correlation Agent using sentence transformers for embeddings
@@ -52,6 +78,10 @@ class AlertCorrelationAgent:
     def __init__(self, use_llm: bool = True, model_name: str = "mistralai/Mistral-7B-Instruct"):
         self.name = "alert_correlation_agent"
         self.use_llm = use_llm
+        self._emb_cache: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._summary_cache: "OrderedDict[str, object]" = OrderedDict()
+        self._summary_cache_hits = 0
+        self._summary_cache_misses = 0
         
         # Initialize sentence transformer for embeddings
         if SENTENCE_TRANSFORMERS_AVAILABLE:
@@ -117,14 +147,15 @@ class AlertCorrelationAgent:
             
             # Generate embeddings
             if self.embedder:
-                embeddings = self.embedder.encode(texts)
+                embeddings = self._encode_cached(texts)
                 logger.info(f"📊 Generated embeddings with shape: {embeddings.shape}")
             else:
                 # Fallback to simple text similarity
                 embeddings = self._fallback_embeddings(texts)
             
             # Perform clustering
-            clusters = self.simple_cluster(embeddings, alerts, threshold=0.8)
+            # Both embedding paths return L2-normalized vectors
+            clusters = self.simple_cluster(embeddings, alerts, threshold=0.8, normalized=True)
             logger.info(f"🎯 Found {len(clusters)} alert clusters")
             
             # Generate summaries using LLM if available
@@ -158,12 +189,53 @@ class AlertCorrelationAgent:
                 "agent_name": self.name
             }
     
+    def _encode_cached(self, texts: List[str]) -> np.ndarray:
+        """Encode texts, reusing cached embeddings for messages seen before"""
+        keys = [hashlib.blake2s(text.encode(), digest_size=16).digest() for text in texts]
+        
+        miss_positions = {}
+        for pos, key in enumerate(keys):
+            if key in self._emb_cache:
+                self._emb_cache.move_to_end(key)
+            else:
+                miss_positions.setdefault(key, pos)
+        
+        if miss_positions:
+            encoded = self.embedder.encode(
+                [texts[pos] for pos in miss_positions.values()],
+                batch_size=64,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False
+            )
+            # fp16 halves cache memory; cosine ranking is unaffected
+            for key, vector in zip(miss_positions, encoded):
+                self._emb_cache[key] = vector.astype(np.float16)
+        
+        embeddings = np.stack([self._emb_cache[key] for key in keys]).astype(np.float32)
+        while len(self._emb_cache) > EMBEDDING_CACHE_SIZE:
+            self._emb_cache.popitem(last=False)
+        
+        logger.info(f"🗂️ Embedding cache: {len(texts) - len(miss_positions)} hits, {len(miss_positions)} misses")
+        return embeddings
+    
     def _format_alert_text(self, alert: Alert) -> str:
         """Format alert for embedding generation"""
         return f"{alert.system} {alert.severity} {alert.category} {alert.message}"
     
-    def _fallback_embeddings(self, texts: List[str]) -> np.ndarray:
+    def _fallback_embeddings(self, texts: List[str]):
         """Fallback embedding method using simple text features"""
+        if SKLEARN_AVAILABLE:
+            # Sparse, L2-normalized term counts; memory scales with non-zeros
+            vectorizer = HashingVectorizer(
+                n_features=2 ** 14,
+                tokenizer=str.split,
+                token_pattern=None,
+                norm="l2",
+                alternate_sign=False
+            )
+            return vectorizer.transform(texts)
+        
         # Simple TF-IDF-like approach
         all_words = set()
         for text in texts:
@@ -178,40 +250,64 @@ class AlertCorrelationAgent:
                 if word in word_to_idx:
                     embeddings[i, word_to_idx[word]] += 1
         
-        # Normalize
+        # Normalize in place; the matrix is local to this call
         norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
         norms[norms == 0] = 1
-        return embeddings / norms
+        embeddings /= norms
+        return embeddings
     
-    def simple_cluster(self, embeddings: np.ndarray, alerts: List[Alert], threshold: float = 0.8) -> List[Dict]:
+    def simple_cluster(self, embeddings: np.ndarray, alerts: List[Alert], threshold: float = 0.8,
+                       normalized: bool = False) -> List[Dict]:
         """
         Simple cosine similarity clustering
+        
+        Pass normalized=True when the embeddings are already L2-normalized to
+        skip the normalization pass.
         """
-        if len(embeddings) == 0:
+        if embeddings.shape[0] == 0:
             return []
         
-        # Calculate cosine similarity matrix
-        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
-        norms[norms == 0] = 1
-        normalized_embeddings = embeddings / norms
-        sims = np.inner(normalized_embeddings, normalized_embeddings)
+        # Normalize once so inner products are cosine similarities
+        if normalized:
+            normalized_embeddings = embeddings
+        elif SKLEARN_AVAILABLE:
+            # Single fused pass; also handles sparse input
+            normalized_embeddings = normalize(embeddings, norm="l2", axis=1)
+        else:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            norms[norms == 0] = 1
+            normalized_embeddings = embeddings / norms
+        neighbors = self._find_neighbors(normalized_embeddings, threshold)
         
-        visited = set()
-        clusters = []
+        # Union-find over above-threshold edges yields single-linkage components
+        parent = list(range(len(alerts)))
         
+        def find(x: int) -> int:
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+        
+        for i, row in enumerate(neighbors):
+            for j in row:
+                if j != i:
+                    root_i, root_j = find(i), find(j)
+                    if root_i != root_j:
+                        parent[max(root_i, root_j)] = min(root_i, root_j)
+        
+        components: Dict[int, List[int]] = {}
         for i in range(len(alerts)):
-            if i in visited:
-                continue
-            
-            # Start new cluster
-            cluster_alerts = [alerts[i]]
-            visited.add(i)
-            
-            # Find similar alerts
-            for j in range(len(alerts)):
-                if j != i and j not in visited and sims[i, j] > threshold:
-                    cluster_alerts.append(alerts[j])
-                    visited.add(j)
+            components.setdefault(find(i), []).append(i)
+        
+        clusters = []
+        
+        for members in components.values():
+            cluster_alerts = [alerts[k] for k in members]
+            member_set = set(members)
+            cluster_sims = [
+                sim for k in members for j, sim in neighbors[k].items()
+                if j != k and j in member_set
+            ]
             
             # Create cluster
             cluster = {
@@ -222,7 +318,7 @@ class AlertCorrelationAgent:
                 "systems": list(set(alert.system for alert in cluster_alerts)),
                 "categories": list(set(alert.category for alert in cluster_alerts)),
                 "time_span_minutes": self._calculate_time_span(cluster_alerts),
-                "similarity_score": float(np.mean([sims[i, j] for j in range(len(alerts)) if j in [alerts.index(a) for a in cluster_alerts] and j != i])) if len(cluster_alerts) > 1 else 1.0
+                "similarity_score": float(np.mean(cluster_sims)) if cluster_sims else 1.0
             }
             
             clusters.append(cluster)
@@ -234,6 +330,53 @@ class AlertCorrelationAgent:
         # Keep only top 10 clusters
         return clusters[:10]
     
+    def _find_neighbors(self, normalized_embeddings: np.ndarray, threshold: float,
+                        block_size: int = 1024) -> List[Dict[int, float]]:
+        """
+        Return, for each embedding, the neighbors whose cosine similarity exceeds
+        the threshold, without materializing the full N×N similarity matrix
+        """
+        n = normalized_embeddings.shape[0]
+        neighbors: List[Dict[int, float]] = [{} for _ in range(n)]
+        
+        if SKLEARN_AVAILABLE and sparse.issparse(normalized_embeddings):
+            # Sparse products cost is proportional to non-zeros, not vocabulary size
+            matrix = normalized_embeddings.tocsr()
+            for start in range(0, n, block_size):
+                block = (matrix[start:start + block_size] @ matrix.T).toarray()
+                rows, cols = np.nonzero(block > threshold)
+                for r, j in zip(rows, cols):
+                    neighbors[start + int(r)][int(j)] = float(block[r, j])
+            return neighbors
+        
+        vectors = np.ascontiguousarray(normalized_embeddings, dtype=np.float32)
+        
+        if FAISS_AVAILABLE:
+            # int8 scalar quantization: cosine is robust to it and it cuts
+            # index memory bandwidth by 4x versus fp32
+            index = faiss.IndexScalarQuantizer(
+                vectors.shape[1], faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT
+            )
+            index.train(vectors)
+            index.add(vectors)
+            lims, distances, indices = index.range_search(vectors, threshold)
+            for i in range(n):
+                for j, sim in zip(indices[lims[i]:lims[i + 1]], distances[lims[i]:lims[i + 1]]):
+                    neighbors[i][int(j)] = min(float(sim), 1.0)
+            return neighbors
+        
+        # Blockwise fallback keeps memory at O(block_size × N)
+        for start in range(0, n, block_size):
+            if SKLEARN_AVAILABLE:
+                # Explicit fp32 GEMM avoids any accidental fp64 promotion
+                block = sgemm(1.0, vectors[start:start + block_size], vectors, trans_b=True)
+            else:
+                block = np.inner(vectors[start:start + block_size], vectors)
+            rows, cols = np.nonzero(block > threshold)
+            for r, j in zip(rows, cols):
+                neighbors[start + int(r)][int(j)] = float(block[r, j])
+        return neighbors
+    
     def _determine_cluster_severity(self, alerts: List[Alert]) -> str:
         """Determine the overall severity of a cluster"""
         severities = [alert.severity for alert in alerts]
@@ -256,23 +399,23 @@ class AlertCorrelationAgent:
     async def _generate_llm_summary(self, clusters: List[Dict]) -> str:
         """Generate summary using LLM"""
         try:
-            # Prepare context for LLM
+            # Prepare context for LLM. Cluster ids are fresh uuid4s on every run: they
+            # carry no information for the summary, would defeat the cache, and a
+            # cached summary citing them would point at clusters that no longer exist
             cluster_data = []
             for cluster in clusters:
                 cluster_info = {
-                    "cluster_id": cluster["cluster_id"],
                     "alert_count": cluster["alert_count"],
                     "severity": cluster["severity"],
-                    "systems": cluster["systems"],
-                    "categories": cluster["categories"],
+                    "systems": sorted(cluster["systems"]),
+                    "categories": sorted(cluster["categories"]),
                     "time_span_minutes": cluster["time_span_minutes"]
                 }
                 cluster_data.append(cluster_info)
             
-            prompt = f"{CORRELATION_PROMPT}\n\nCluster Data:\n{json.dumps(cluster_data, indent=2)}"
-            
-            # Generate response
-            response = self.llm(prompt)
+            # Generate response (memoized on the canonical cluster data)
+            response = self._summarize_cluster_data(json.dumps(cluster_data, indent=2, sort_keys=True))
+            logger.info(f"🧠 LLM summary cache: {self._summary_cache_hits} hits, {self._summary_cache_misses} misses")
             
             # Extract summary from response
             if isinstance(response, str):
@@ -284,6 +427,21 @@ class AlertCorrelationAgent:
             logger.error(f"LLM summary generation error: {e}")
             return self._generate_fallback_summary(clusters)
     
+    def _summarize_cluster_data(self, cluster_json: str):
+        """Run the LLM over serialized cluster data, reusing responses for identical data"""
+        if cluster_json in self._summary_cache:
+            self._summary_cache.move_to_end(cluster_json)
+            self._summary_cache_hits += 1
+            return self._summary_cache[cluster_json]
+        
+        prompt = f"{CORRELATION_PROMPT}\n\nCluster Data:\n{cluster_json}"
+        response = self.llm(prompt)
+        self._summary_cache_misses += 1
+        self._summary_cache[cluster_json] = response
+        while len(self._summary_cache) > SUMMARY_CACHE_SIZE:
+            self._summary_cache.popitem(last=False)
+        return response
+    
     def _generate_fallback_summary(self, clusters: List[Dict]) -> str:
         """Generate summary without LLM"""
         if not clusters:
@@ -1,12 +1,94 @@
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, FrozenSet, Iterator
 from datetime import datetime, timedelta
-from collections import defaultdict
+from collections import Counter, defaultdict
+from functools import lru_cache
 import hashlib
 import logging
+import numpy as np
 from app.models.alert import Alert
 
+try:
+    from sklearn.feature_extraction.text import HashingVectorizer
+    SKLEARN_AVAILABLE = True
+except ImportError:
+    SKLEARN_AVAILABLE = False
+    HashingVectorizer = None
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    njit = None
+
 logger = logging.getLogger(__name__)
 
+_BLAKE2B = hashlib.blake2b
+
+
+@lru_cache(maxsize=4096)
+def _signature_hex(signature_key: Tuple[str, str, str, str]) -> str:
+    """Hex id for a signature tuple; signatures recur across batches, so it is memoized"""
+    return _BLAKE2B(":".join(signature_key).encode(), digest_size=16).hexdigest()
+
+
+def _window_kernel(code_order: np.ndarray, codes: np.ndarray, timestamps: np.ndarray,
+                   window_ns: int) -> np.ndarray:
+    """
+    Assign every alert the position of its group's primary alert
+    
+    code_order visits alerts grouped by signature code and, within a code, in
+    timestamp order. A new group starts at the first alert of a code or at the
+    first alert past the current primary's time window, so every duplicate lies
+    within the window of its primary (runs of alerts are not chained together).
+    Timestamps and window are int64 epoch nanoseconds, so the check is pure
+    integer arithmetic.
+    """
+    primary_of = np.empty(len(code_order), dtype=np.int64)
+    primary = -1
+    for k in range(len(code_order)):
+        index = code_order[k]
+        if (primary < 0 or codes[index] != codes[primary]
+                or timestamps[index] - timestamps[primary] > window_ns):
+            primary = index
+        primary_of[index] = primary
+    return primary_of
+
+
+def _components_kernel(size: int, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """
+    Union-find over similarity edges; returns each position's component root
+    
+    Roots are always the smallest (earliest) position of their component, so the
+    root doubles as the group's primary alert.
+    """
+    parent = np.arange(size)
+    for k in range(len(left)):
+        root_left = left[k]
+        while parent[root_left] != root_left:
+            parent[root_left] = parent[parent[root_left]]
+            root_left = parent[root_left]
+        root_right = right[k]
+        while parent[root_right] != root_right:
+            parent[root_right] = parent[parent[root_right]]
+            root_right = parent[root_right]
+        if root_left < root_right:
+            parent[root_right] = root_left
+        elif root_right < root_left:
+            parent[root_left] = root_right
+    for index in range(size):
+        root = index
+        while parent[root] != root:
+            root = parent[root]
+        parent[index] = root
+    return parent
+
+
+if NUMBA_AVAILABLE:
+    _window_kernel = njit(cache=True)(_window_kernel)
+    _components_kernel = njit(cache=True)(_components_kernel)
+
+
 class AlertDeduplicationEngine:
     """
     Deduplicates and groups similar alerts to reduce noise
@@ -27,15 +109,22 @@ class AlertDeduplicationEngine:
             time_window_minutes: Time window for grouping similar alerts (default: 5 minutes)
         """
         self.time_window = timedelta(minutes=time_window_minutes)
+        # Plain-float copies of the window for comparisons and result payloads
+        self._window_sec = float(time_window_minutes * 60)
+        self._window_min = self._window_sec / 60
+        # Subclasses that override _is_content_similar set this to True
+        self.uses_content_similarity = False
         self.alert_groups = defaultdict(list)
         logger.info(f"AlertDeduplicationEngine initialized with {time_window_minutes}min time window")
     
-    def deduplicate_alerts(self, alerts: List[Alert]) -> Dict:
+    def deduplicate_alerts(self, alerts: List[Alert], return_alerts: bool = True) -> Dict:
         """
         Group and deduplicate alerts to reduce noise
         
         Args:
             alerts: List of Alert objects to deduplicate
+            return_alerts: When False, unique_alerts and duplicate_groups are left
+                empty so statistics-only callers do not hold the alert payloads
             
         Returns:
             Dictionary containing:
@@ -52,132 +141,203 @@ class AlertDeduplicationEngine:
                 "noise_reduction_percentage": 0,
                 "unique_alerts": [],
                 "duplicate_groups": [],
-                "time_window_minutes": self.time_window.total_seconds() / 60
+                "time_window_minutes": self._window_min
             }
         
-        # Sort alerts by timestamp
-        sorted_alerts = sorted(alerts, key=lambda a: a.timestamp)
-        
+        # Accumulate every statistic in the single pass over the groups
         unique_alerts = []
         duplicate_groups = []
-        processed_alert_ids = set()
+        unique_count = 0
+        duplicate_group_count = 0
+        severity_distribution = Counter()
+        total_group_count = 0
+        max_group_count = 0
         
-        for alert in sorted_alerts:
-            if alert.id in processed_alert_ids:
-                continue
-            
-            # Check if similar alert exists in time window
-            similar_alerts = self._find_similar_alerts(alert, sorted_alerts, processed_alert_ids)
+        for group in self.iter_groups(alerts):
+            unique_count += 1
+            severity_distribution[group["severity"]] += 1
+            if return_alerts:
+                unique_alerts.append(group["primary_alert"])
             
-            if similar_alerts:
-                # Found duplicates - create a group
-                group = {
-                    "primary_alert": alert,
-                    "duplicate_alerts": similar_alerts,
-                    "count": len(similar_alerts) + 1,
-                    "signature": self._create_alert_signature(alert),
-                    "time_span_minutes": self._calculate_time_span(alert, similar_alerts),
-                    "severity": alert.severity,
-                    "system": alert.system,
-                    "category": alert.category
-                }
-                duplicate_groups.append(group)
-                
-                # Mark all as processed
-                processed_alert_ids.add(alert.id)
-                for dup in similar_alerts:
-                    processed_alert_ids.add(dup.id)
-                
-                # Add primary alert to unique list
-                unique_alerts.append(alert)
-            else:
-                # No duplicates found
-                unique_alerts.append(alert)
-                processed_alert_ids.add(alert.id)
+            count = group["count"]
+            if count > 1:
+                duplicate_group_count += 1
+                total_group_count += count
+                max_group_count = max(max_group_count, count)
+                if return_alerts:
+                    duplicate_groups.append(group)
         
         # Calculate statistics
         original_count = len(alerts)
-        unique_count = len(unique_alerts)
         duplicate_count = original_count - unique_count
         noise_reduction = ((duplicate_count) / original_count * 100) if original_count > 0 else 0
         
-        # Calculate severity distribution
-        severity_distribution = self._calculate_severity_distribution(unique_alerts)
-        
-        return {
+        result = {
             "original_alert_count": original_count,
             "unique_alert_count": unique_count,
             "duplicate_count": duplicate_count,
             "noise_reduction_percentage": round(noise_reduction, 1),
             "unique_alerts": unique_alerts,
             "duplicate_groups": duplicate_groups,
-            "duplicate_group_count": len(duplicate_groups),
-            "time_window_minutes": self.time_window.total_seconds() / 60,
-            "severity_distribution": severity_distribution,
+            "duplicate_group_count": duplicate_group_count,
+            "time_window_minutes": self._window_min,
+            "severity_distribution": dict(severity_distribution),
             "statistics": {
-                "avg_duplicates_per_group": round(sum(g['count'] for g in duplicate_groups) / len(duplicate_groups), 1) if duplicate_groups else 0,
-                "max_duplicates_in_group": max((g['count'] for g in duplicate_groups), default=0),
+                "avg_duplicates_per_group": round(total_group_count / duplicate_group_count, 1) if duplicate_group_count else 0,
+                "max_duplicates_in_group": max_group_count,
                 "total_time_saved_minutes": self._estimate_time_saved(duplicate_count)
             }
         }
+        
+        return result
     
-    def _find_similar_alerts(self, alert: Alert, all_alerts: List[Alert], processed_ids: set) -> List[Alert]:
-        """Find all alerts similar to the given alert within the time window"""
-        similar = []
+    def iter_groups(self, alerts: List[Alert]) -> Iterator[Dict]:
+        """
+        Yield one group per unique alert, in timestamp order of the primary
+        
+        Each group has the duplicate_groups shape (primary_alert, duplicate_alerts,
+        count, signature, time_span_minutes, severity, system, category); alerts
+        without duplicates come through with count 1 and no duplicate_alerts.
+        This is not streaming: group assignment runs over the whole batch before
+        the first yield. Only the per-group dicts are built on demand.
+        """
+        if not alerts:
+            return
         
-        for other_alert in all_alerts:
-            if other_alert.id == alert.id or other_alert.id in processed_ids:
+        # Sort alerts by timestamp: int64 epoch nanoseconds are extracted once and
+        # ordered with a stable C-level argsort instead of a Python key function.
+        # Rounding to whole microseconds first keeps datetime's resolution exact.
+        raw_timestamps = np.fromiter(
+            (round(alert.timestamp.timestamp() * 1e6) * 1000 for alert in alerts),
+            dtype=np.int64,
+            count=len(alerts)
+        )
+        time_order = np.argsort(raw_timestamps, kind="stable")
+        sorted_alerts = [alerts[i] for i in time_order.tolist()]
+        timestamps = raw_timestamps[time_order]
+        
+        # Signatures as int32 categorical codes
+        signature_codes = {}
+        codes = np.fromiter(
+            (
+                signature_codes.setdefault(self._signature_key(alert), len(signature_codes))
+                for alert in sorted_alerts
+            ),
+            dtype=np.int32,
+            count=len(sorted_alerts)
+        )
+        window_ns = int(self._window_sec * 1e9)
+        
+        code_order = np.argsort(codes, kind="stable")
+        
+        if self.uses_content_similarity:
+            left, right = self._content_similarity_edges(
+                sorted_alerts, code_order, codes, timestamps, window_ns
+            )
+            primary_of = _components_kernel(len(sorted_alerts), left, right)
+        else:
+            # Metadata-only grouping runs entirely on the SoA arrays
+            primary_of = _window_kernel(code_order, codes, timestamps, window_ns)
+        
+        group_members = defaultdict(list)
+        for index, primary in enumerate(primary_of.tolist()):
+            if primary != index:
+                group_members[primary].append(index)
+        
+        signature_hashes = {}
+        for index, alert in enumerate(sorted_alerts):
+            if primary_of[index] != index:
                 continue
             
-            if self._is_similar_alert(alert, other_alert):
-                similar.append(other_alert)
+            similar_indices = group_members.get(index, [])
+            
+            # Signature hashed once per key
+            key = int(codes[index])
+            if key not in signature_hashes:
+                signature_hashes[key] = self._create_alert_signature(alert)
+            
+            # Members are time-ordered, so the span runs primary -> last duplicate
+            time_span = (timestamps[similar_indices[-1]] - timestamps[index]) / 6e10 if similar_indices else 0
+            yield {
+                "primary_alert": alert,
+                "duplicate_alerts": [sorted_alerts[other_index] for other_index in similar_indices],
+                "count": len(similar_indices) + 1,
+                "signature": signature_hashes[key],
+                "time_span_minutes": round(float(time_span), 1),
+                "severity": alert.severity,
+                "system": alert.system,
+                "category": alert.category
+            }
+    
+    def _content_similarity_edges(self, sorted_alerts: List[Alert], code_order: np.ndarray,
+                                  codes: np.ndarray, timestamps: np.ndarray,
+                                  window_ns: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Enumerate duplicate edges when alerts must also pass the content check
         
-        return similar
+        An edge links two same-signature alerts within the time window of each
+        other whose content matches; groups are the connected components.
+        """
+        content = self._prepare_content_similarity(sorted_alerts)
+        
+        # Per signature bucket (time-ordered), locate every member's window end
+        # with one vectorized searchsorted
+        buckets = []
+        for bucket in np.split(code_order, np.flatnonzero(np.diff(codes[code_order])) + 1):
+            bucket_times = timestamps[bucket]
+            buckets.append((bucket, np.searchsorted(bucket_times, bucket_times + window_ns, side="right")))
+        
+        return self._bucket_edges(content, sorted_alerts, buckets)
     
-    def _create_alert_signature(self, alert: Alert) -> str:
-        """Create unique signature for alert based on key attributes"""
-        signature_string = f"{alert.client_id}:{alert.system}:{alert.category}:{alert.severity}"
-        return hashlib.md5(signature_string.encode()).hexdigest()
-    
-    def _is_similar_alert(self, alert1: Alert, alert2: Alert) -> bool:
-        """
-        Check if two alerts are similar (duplicates)
-        
-        Criteria:
-        - Same client
-        - Same system
-        - Same category
-        - Same severity
-        - Within time window
-        """
-        # Same client, system, category, and severity
-        if (alert1.client_id == alert2.client_id and
-            alert1.system == alert2.system and
-            alert1.category == alert2.category and
-            alert1.severity == alert2.severity):
-            
-            # Within time window
-            time_diff = abs((alert1.timestamp - alert2.timestamp).total_seconds())
-            if time_diff <= self.time_window.total_seconds():
-                return True
+    def _bucket_edges(self, content, sorted_alerts: List[Alert],
+                      buckets: List[Tuple[np.ndarray, np.ndarray]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Content-matching edges from each bucket member to its later window candidates"""
+        left = []
+        right = []
+        for bucket, window_ends in buckets:
+            window_ends = window_ends.tolist()
+            for position, index in enumerate(bucket.tolist()):
+                candidates = bucket[position + 1:window_ends[position]]
+                if len(candidates) == 0:
+                    continue
+                similar_indices = self._content_similar_indices(content, sorted_alerts, index, candidates)
+                left.extend([index] * len(similar_indices))
+                right.extend(similar_indices)
         
-        return False
+        return np.asarray(left, dtype=np.int64), np.asarray(right, dtype=np.int64)
     
-    def _calculate_time_span(self, primary_alert: Alert, similar_alerts: List[Alert]) -> float:
-        """Calculate time span of duplicate group in minutes"""
-        if not similar_alerts:
-            return 0
+    def _prepare_content_similarity(self, sorted_alerts: List[Alert]):
+        """Batch-level state for _content_similar_indices; the base engine needs none"""
+        return None
+    
+    def _content_similar_indices(self, content, sorted_alerts: List[Alert], index: int,
+                                 candidates: np.ndarray) -> List[int]:
+        """Return the candidate positions whose content matches the primary at index"""
+        alert = sorted_alerts[index]
+        return [
+            other_index for other_index in candidates.tolist()
+            if self._is_content_similar(alert, sorted_alerts[other_index])
+        ]
+    
+    def _signature_key(self, alert: Alert) -> Tuple[str, str, str, str]:
+        """
+        Hashable signature tuple used for grouping; no string building or hashing
         
-        all_timestamps = [primary_alert.timestamp] + [a.timestamp for a in similar_alerts]
-        time_span = (max(all_timestamps) - min(all_timestamps)).total_seconds() / 60
-        return round(time_span, 1)
+        Duplicates share client, system, category and severity, i.e. this tuple,
+        and fall within the time window of their primary.
+        """
+        return (alert.client_id, alert.system, alert.category, alert.severity)
     
-    def _calculate_severity_distribution(self, alerts: List[Alert]) -> Dict[str, int]:
-        """Calculate distribution of alerts by severity"""
-        distribution = defaultdict(int)
-        for alert in alerts:
-            distribution[alert.severity] += 1
-        return dict(distribution)
+    def _create_alert_signature(self, alert: Alert) -> str:
+        """Create unique signature for alert based on key attributes (hex id for API consumers)"""
+        return _signature_hex(self._signature_key(alert))
+    
+    def _is_content_similar(self, alert1: Alert, alert2: Alert) -> bool:
+        """
+        Extra similarity check for alerts already known to share a signature
+        and fall within the time window; the base engine has none
+        """
+        return True
     
     def _estimate_time_saved(self, duplicate_count: int) -> int:
         """
@@ -203,34 +363,150 @@ class AdvancedAlertDeduplicationEngine(AlertDeduplicationEngine):
     Uses message content similarity in addition to metadata
     """
     
+    PAIR_CACHE_SIZE = 100000
+    # Bucket members scored per block; bounds the dense block to this many
+    # rows times the widest window
+    SIMILARITY_BLOCK_SIZE = 256
+    # Up to this many distinct messages, all message pairs are scored at once
+    MESSAGE_MATRIX_SIZE = 1024
+    TOKEN_CACHE_SIZE = 10000
+    
     def __init__(self, time_window_minutes: int = 5, similarity_threshold: float = 0.8):
+        """
+        Initialize the advanced deduplication engine
+        
+        Args:
+            time_window_minutes: Time window for grouping similar alerts (default: 5 minutes)
+            similarity_threshold: Minimum message similarity for two alerts to be duplicates.
+                With scikit-learn installed this is the cosine similarity of character
+                3-5-gram vectors of the messages; without it, the word-overlap (Jaccard)
+                ratio. The two scales differ: n-gram cosine scores near-identical messages
+                higher than word Jaccard, so 0.8 here accepts somewhat looser matches than
+                the word-overlap threshold it replaced (default: 0.8)
+        """
         super().__init__(time_window_minutes)
         self.similarity_threshold = similarity_threshold
+        self.uses_content_similarity = True
+        # Tokens interned to small ints; token sets cached per distinct message.
+        # Only the word-Jaccard fallback (no scikit-learn) uses them.
+        self._vocab: Dict[str, int] = {}
+        self._tok_cache: Dict[str, FrozenSet[int]] = {}
+        # Verdicts per (message, message) pair; alert storms repeat a handful of
+        # distinct messages, so most candidate checks become one dict lookup
+        self._pair_cache: Dict[Tuple[str, str], bool] = {}
+    
+    def _is_content_similar(self, alert1: Alert, alert2: Alert) -> bool:
+        """Message similarity check applied within a signature bucket"""
+        pair = (alert1.message, alert2.message)
+        verdict = self._pair_cache.get(pair)
+        if verdict is None:
+            if len(self._pair_cache) >= self.PAIR_CACHE_SIZE:
+                self._pair_cache.clear()
+            message_similarity = self._calculate_message_similarity(alert1.message, alert2.message)
+            verdict = self._pair_cache[pair] = message_similarity >= self.similarity_threshold
+        return verdict
     
-    def _is_similar_alert(self, alert1: Alert, alert2: Alert) -> bool:
+    def _prepare_content_similarity(self, sorted_alerts: List[Alert]):
         """
-        Enhanced similarity check including message content
+        Vectorize the batch's distinct messages once as L2-normalized character
+        n-gram counts, so similarities (cosine) come from sparse products over
+        whole blocks of alerts. Returns None without scikit-learn, falling back
+        to per-pair word Jaccard.
         """
-        # First check basic similarity
-        if not super()._is_similar_alert(alert1, alert2):
-            return False
+        if not SKLEARN_AVAILABLE:
+            return None
         
-        # Additional check: message similarity
-        message_similarity = self._calculate_message_similarity(alert1.message, alert2.message)
-        return message_similarity >= self.similarity_threshold
+        message_rows: Dict[str, int] = {}
+        rows = np.fromiter(
+            (message_rows.setdefault(alert.message, len(message_rows)) for alert in sorted_alerts),
+            dtype=np.int64,
+            count=len(sorted_alerts)
+        )
+        vectorizer = HashingVectorizer(
+            analyzer="char_wb",
+            ngram_range=(3, 5),
+            n_features=2 ** 18,
+            alternate_sign=False,
+            norm="l2"
+        )
+        matrix = vectorizer.transform(list(message_rows)).tocsr()
+        # Keep only the hashed features that occur: products transpose the matrix,
+        # and that costs time in its width. Cosine is unchanged by dropping zeros.
+        return rows, matrix[:, np.unique(matrix.indices)]
+    
+    def _bucket_edges(self, content, sorted_alerts: List[Alert],
+                      buckets: List[Tuple[np.ndarray, np.ndarray]]) -> Tuple[np.ndarray, np.ndarray]:
+        if content is None:
+            return super()._bucket_edges(content, sorted_alerts, buckets)
+        
+        rows, matrix = content
+        # Alert storms repeat a handful of messages: with few distinct messages,
+        # one product scores every message pair up front and buckets only index it
+        similar = None
+        if matrix.shape[0] <= self.MESSAGE_MATRIX_SIZE:
+            similar = (matrix @ matrix.T).toarray() >= self.similarity_threshold
+        
+        left = []
+        right = []
+        for bucket, window_ends in buckets:
+            size = len(bucket)
+            # Skip buckets where no member has a later alert inside its window
+            if size < 2 or not np.any(window_ends > np.arange(1, size + 1)):
+                continue
+            
+            bucket_rows = rows[bucket]
+            vectors = matrix[bucket_rows] if similar is None else None
+            # Score a block of members against every column any of them can reach
+            # at once, then keep the upper-triangle pairs that lie inside each
+            # member's window and pass the threshold
+            for start in range(0, size, self.SIMILARITY_BLOCK_SIZE):
+                stop = min(start + self.SIMILARITY_BLOCK_SIZE, size)
+                column_stop = int(window_ends[stop - 1])
+                if column_stop - start < 2:
+                    continue
+                if similar is None:
+                    sims = (vectors[start:stop] @ vectors[start:column_stop].T).toarray()
+                    matched = sims >= self.similarity_threshold
+                else:
+                    matched = similar[np.ix_(bucket_rows[start:stop], bucket_rows[start:column_stop])]
+                positions = np.arange(start, stop)[:, None]
+                columns = np.arange(start, column_stop)[None, :]
+                in_window = (columns > positions) & (columns < window_ends[start:stop, None])
+                member, other = np.nonzero(in_window & matched)
+                left.append(bucket[member + start])
+                right.append(bucket[other + start])
+        
+        if not left:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        return np.concatenate(left).astype(np.int64), np.concatenate(right).astype(np.int64)
     
     def _calculate_message_similarity(self, message1: str, message2: str) -> float:
         """
         Calculate similarity between two alert messages
         Simple implementation using word overlap (can be enhanced with embeddings)
         """
-        words1 = set(message1.lower().split())
-        words2 = set(message2.lower().split())
+        if len(self._tok_cache) >= self.TOKEN_CACHE_SIZE:
+            # Token ids are only meaningful with their vocabulary, so both reset
+            # together, and never between tokenizing the two messages
+            self._tok_cache.clear()
+            self._vocab.clear()
+        
+        words1 = self._message_tokens(message1)
+        words2 = self._message_tokens(message2)
         
         if not words1 or not words2:
             return 0.0
         
-        intersection = words1.intersection(words2)
-        union = words1.union(words2)
+        intersection = len(words1 & words2)
+        union = len(words1) + len(words2) - intersection
         
-        return len(intersection) / len(union) if union else 0.0
+        return intersection / union if union else 0.0
+    
+    def _message_tokens(self, message: str) -> FrozenSet[int]:
+        """Interned token-id set for a message, tokenized once per distinct message"""
+        tokens = self._tok_cache.get(message)
+        if tokens is None:
+            vocab = self._vocab
+            tokens = frozenset(vocab.setdefault(word, len(vocab)) for word in message.lower().split())
+            self._tok_cache[message] = tokens
+        return tokens
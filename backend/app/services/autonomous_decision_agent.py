@@ -1,22 +1,24 @@
 import asyncio
+import hashlib
 import json
 import logging
+import re
+import threading
+import time
 import numpy as np
-from typing import List, Dict, Optional, Tuple
+from collections import Counter, OrderedDict
+from typing import List, Dict, FrozenSet, Optional, Tuple
 from datetime import datetime, timedelta
 from dataclasses import dataclass
 from enum import Enum
+from types import MappingProxyType
 
 try:
-    from sklearn.ensemble import RandomForestClassifier
-    from sklearn.linear_model import LogisticRegression
-    from sklearn.preprocessing import StandardScaler
-    SKLEARN_AVAILABLE = True
+    from numba import njit
+    NUMBA_AVAILABLE = True
 except ImportError:
-    SKLEARN_AVAILABLE = False
-    RandomForestClassifier = None
-    LogisticRegression = None
-    StandardScaler = None
+    NUMBA_AVAILABLE = False
+    njit = None
 
 try:
     import google.generativeai as genai
@@ -31,6 +33,63 @@ from app.models.alert import Alert, Client
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Score lookup tables for the feature kernel, indexed by integer codes; the
+# extra last slot holds the score for unknown values
+SEVERITY_CODES = MappingProxyType({'critical': 0, 'warning': 1, 'info': 2, 'low': 3})
+SEVERITY_SCORES = np.array([1.0, 0.7, 0.3, 0.1, 0.5])
+TIER_CODES = MappingProxyType({'enterprise': 0, 'premium': 1, 'standard': 2, 'basic': 3})
+TIER_SCORES = np.array([1.0, 0.8, 0.6, 0.4, 0.5])
+# Criticality codes: critical system, >2 dependencies, some dependencies, none
+CRITICALITY_SCORES = np.array([1.0, 0.8, 0.6, 0.4])
+
+# Feature vector order shared by the scoring kernel and the weights
+FEATURE_SCORE_KEYS = (
+    'severity_score',
+    'cascade_risk_score',
+    'client_tier_score',
+    'business_hours_score',
+    'system_criticality_score',
+    'historical_frequency_score',
+    'load_impact_score'
+)
+
+
+def _compute_feature_vector(features: np.ndarray, severity_code: int, cascade_risk: float,
+                            tier_code: int, business_hours: bool, criticality_code: int,
+                            hist_count: int, current_load: float) -> np.ndarray:
+    """Fill the 7-feature score vector (in place) from pre-encoded codes"""
+    features[0] = SEVERITY_SCORES[severity_code]
+    features[1] = cascade_risk
+    features[2] = TIER_SCORES[tier_code]
+    features[3] = 1.0 if business_hours else 0.5
+    features[4] = CRITICALITY_SCORES[criticality_code]
+    features[5] = min(1.0, hist_count / 10.0)
+    features[6] = min(1.0, current_load / 100.0)
+    return features
+
+
+def _aggregate_scores(features: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """
+    Per-row business impact, cost impact and SLA risk for a (N, 7) feature matrix
+    
+    Compiled serially: batches are a handful of rows scored on the event-loop
+    thread, where starting prange worker threads would cost more than it saves.
+    """
+    aggregates = np.empty((features.shape[0], 3))
+    for row in range(features.shape[0]):
+        business_impact = 0.0
+        for column in range(features.shape[1]):
+            business_impact += features[row, column] * weights[column]
+        aggregates[row, 0] = business_impact
+        aggregates[row, 1] = features[row, 0] * features[row, 3] * features[row, 2]
+        aggregates[row, 2] = features[row, 1] * features[row, 4]
+    return aggregates
+
+
+if NUMBA_AVAILABLE:
+    _compute_feature_vector = njit(cache=True)(_compute_feature_vector)
+    _aggregate_scores = njit(cache=True)(_aggregate_scores)
+
 class DecisionType(Enum):
     PREVENT = "prevent"
     MONITOR = "monitor"
@@ -43,7 +102,85 @@ class ActionPriority(Enum):
     MEDIUM = 3
     LOW = 4
 
-@dataclass
+# Decision class by (business_impact bucket, sla_risk bucket); each score is
+# split into five 0.2-wide buckets. Classes: 0=ignore, 1=monitor, 2=prevent,
+# 3=escalate
+RULE_TABLE = np.array([
+    [0, 0, 1, 1, 1],
+    [0, 1, 1, 2, 2],
+    [1, 1, 2, 3, 3],
+    [1, 2, 2, 3, 3],
+    [2, 3, 3, 3, 3]
+], dtype=np.int8)
+RULE_BUCKETS = RULE_TABLE.shape[0]
+RULE_DECISIONS = (DecisionType.IGNORE, DecisionType.MONITOR, DecisionType.PREVENT, DecisionType.ESCALATE)
+
+# Recommended actions per decision type, plus system-specific additions
+BASE_ACTIONS = {
+    DecisionType.ESCALATE: (
+        "Immediately notify senior technician",
+        "Activate emergency response protocol",
+        "Begin client communication",
+        "Prepare rollback procedures"
+    ),
+    DecisionType.PREVENT: (
+        "Scale affected system resources",
+        "Enable automated failover",
+        "Clear system bottlenecks",
+        "Monitor cascade indicators"
+    ),
+    DecisionType.MONITOR: (
+        "Increase monitoring frequency",
+        "Set up alert thresholds",
+        "Document incident pattern",
+        "Prepare response plan"
+    ),
+    DecisionType.IGNORE: (
+        "Log for pattern analysis",
+        "Continue standard monitoring",
+        "Update noise filters"
+    )
+}
+SYSTEM_ACTIONS = {
+    "database": ("Check connection pool status",),
+    "network-gateway": ("Verify routing tables",)
+}
+# Any other system whose name contains "web"
+WEB_SYSTEM_ACTIONS = ("Check application health",)
+MAX_RECOMMENDED_ACTIONS = 4
+EMERGENCY_ACTIONS = ("Manual review required", "Monitor system status")
+
+# Reasoning is streamed and cut off after this many sentences; the token cap
+# bounds generation regardless
+REASONING_MAX_SENTENCES = 3
+REASONING_MAX_OUTPUT_TOKENS = 120
+_SENTENCE_END_RE = re.compile(r'[.!?]\s')
+
+# Gemini reasoning prompt, filled with str.format_map per decision
+PROMPT_TMPL = """
+        You are an autonomous decision agent for IT infrastructure management.
+        
+        ALERT CONTEXT:
+        - System: {system}
+        - Severity: {severity}
+        - Message: {message}
+        - Cascade Risk: {cascade_risk}
+        - Client: {client_name} (Tier: {client_tier})
+        - Business Hours: {business_hours}
+        
+        DETERMINISTIC SCORES:
+        - Business Impact: {business_impact:.2f}
+        - Cost Impact: {cost_impact:.2f}
+        - SLA Risk: {sla_risk:.2f}
+        
+        DECISION: {decision}
+        
+        Provide a concise 2-3 sentence explanation of why this decision was made,
+        focusing on business impact, cost considerations, and SLA risks.
+        Be specific about the factors that influenced this decision.
+        """
+
+@dataclass(slots=True)
 class DecisionContext:
     """Context for decision making"""
     alert: Alert
@@ -53,8 +190,18 @@ class DecisionContext:
     business_hours: bool
     client_tier: str
     current_load: float
+    # (alert_category, severity) -> count over historical_patterns; built on
+    # construction unless given, so contexts for one client can share one index
+    pattern_index: Optional[Dict[Tuple[str, str], int]] = None
+    
+    def __post_init__(self):
+        if self.pattern_index is None:
+            self.pattern_index = Counter(
+                (pattern.get('alert_category'), pattern.get('severity'))
+                for pattern in self.historical_patterns
+            )
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DecisionResult:
     """Result of autonomous decision"""
     decision: DecisionType
@@ -64,7 +211,7 @@ class DecisionResult:
     business_impact_score: float
     cost_impact_score: float
     sla_risk_score: float
-    recommended_actions: List[str]
+    recommended_actions: Tuple[str, ...]
     estimated_execution_time: int  # minutes
     success_probability: float
     fallback_used: bool = False
@@ -72,13 +219,14 @@ class DecisionResult:
 class DeterministicScorer:
     """
     Deterministic scorer for business logic (cost impact, SLA, etc.)
-    Uses NumPy/Scikit-learn for core ranking
+    Uses NumPy for core ranking
     """
     
     def __init__(self):
-        self.scaler = StandardScaler() if SKLEARN_AVAILABLE else None
-        self.decision_model = None
-        self._initialize_models()
+        # Per-thread (2, 7) scratch rows for single decisions: features, weighted features
+        self._buffers = threading.local()
+        # client.id -> (client, critical systems, dependency count per system)
+        self._client_profiles: Dict[str, Tuple[Client, FrozenSet[str], Dict[str, int]]] = {}
         
         # Business logic weights
         self.weights = {
@@ -90,142 +238,143 @@ class DeterministicScorer:
             'historical_frequency': 0.10,
             'load_impact': 0.05
         }
-    
-    def _initialize_models(self):
-        """Initialize ML models for decision scoring"""
-        if not SKLEARN_AVAILABLE:
-            logger.warning("⚠️ Scikit-learn not available, using fallback scoring")
-            return
-        
-        try:
-            # Train a simple decision model on synthetic data
-            self._train_decision_model()
-            logger.info("✅ Deterministic scorer models initialized")
-        except Exception as e:
-            logger.error(f"❌ Failed to initialize models: {e}")
-            self.decision_model = None
-    
-    def _train_decision_model(self):
-        """Train decision model on synthetic business data"""
-        # Generate synthetic training data
-        np.random.seed(42)
-        n_samples = 1000
-        
-        # Features: [severity, cascade_risk, client_tier, business_hours, system_criticality, historical_freq, load_impact]
-        X = np.random.rand(n_samples, 7)
-        
-        # Labels: 0=ignore, 1=monitor, 2=prevent, 3=escalate
-        y = np.random.randint(0, 4, n_samples)
-        
-        # Train model
-        self.decision_model = RandomForestClassifier(n_estimators=50, random_state=42)
-        self.decision_model.fit(X, y)
-        
-        # Fit scaler
-        self.scaler.fit(X)
+        # Same weights in feature-vector order, for matrix products
+        self._weights_vec = np.array([self.weights[key.replace('_score', '')] for key in FEATURE_SCORE_KEYS])
     
     def score_decision(self, context: DecisionContext) -> Dict[str, float]:
         """Score decision using deterministic business logic"""
         
-        # Extract features
-        features = self._extract_features(context)
-        
-        # Calculate individual scores
-        scores = {
-            'severity_score': self._score_severity(context.alert.severity),
-            'cascade_risk_score': context.alert.cascade_risk,
-            'client_tier_score': self._score_client_tier(context.client_tier),
-            'business_hours_score': 1.0 if context.business_hours else 0.5,
-            'system_criticality_score': self._score_system_criticality(context.alert.system, context.client),
-            'historical_frequency_score': self._score_historical_frequency(context.alert, context.historical_patterns),
-            'load_impact_score': min(1.0, context.current_load / 100.0)
-        }
+        # Extract features (order: FEATURE_SCORE_KEYS) into this thread's scratch row
+        scratch = self._scratch()
+        features = self._extract_features(context, scratch[0])
+        values = features.tolist()
+        severity, cascade_risk, client_tier, business_hours, system_criticality = values[:5]
         
-        # Calculate weighted business impact
-        business_impact = sum(scores[key] * self.weights[key.replace('_score', '')] 
-                            for key in scores.keys())
+        # Calculate weighted business impact (summed like the batch path, so
+        # single and batch scores agree to the bit)
+        business_impact = float(np.multiply(features, self._weights_vec, out=scratch[1]).sum())
         
         # Calculate cost impact (higher severity + business hours = higher cost)
-        cost_impact = (scores['severity_score'] * scores['business_hours_score'] * 
-                      scores['client_tier_score'])
+        cost_impact = severity * business_hours * client_tier
         
         # Calculate SLA risk (cascade risk + system criticality)
-        sla_risk = (scores['cascade_risk_score'] * scores['system_criticality_score'])
-        
-        # Use ML model if available
-        ml_decision = None
-        if self.decision_model and self.scaler:
-            try:
-                feature_array = np.array([list(scores.values())]).reshape(1, -1)
-                scaled_features = self.scaler.transform(feature_array)
-                ml_decision = self.decision_model.predict(scaled_features)[0]
-            except Exception as e:
-                logger.warning(f"ML model prediction failed: {e}")
+        sla_risk = cascade_risk * system_criticality
         
         return {
             'business_impact': business_impact,
             'cost_impact': cost_impact,
             'sla_risk': sla_risk,
-            'ml_decision': ml_decision,
-            'feature_scores': scores
+            # Named scores, kept for callers of feature_scores
+            'feature_scores': dict(zip(FEATURE_SCORE_KEYS, values))
         }
     
-    def _extract_features(self, context: DecisionContext) -> List[float]:
-        """Extract numerical features from context"""
+    def _scratch(self) -> np.ndarray:
+        """This thread's preallocated (2, 7) buffer for score_decision"""
+        scratch = getattr(self._buffers, 'scratch', None)
+        if scratch is None:
+            scratch = self._buffers.scratch = np.empty((2, 7), dtype=np.float64)
+        return scratch
+    
+    def score_decisions_batch(self, contexts: List[DecisionContext]) -> List[Dict[str, float]]:
+        """
+        Score many decisions at once
+        
+        Builds one (N, 7) feature matrix and computes the aggregates in one
+        serial compiled kernel (plain Python loop without Numba). Returns one
+        score dict per context, shaped like score_decision's.
+        """
+        if not contexts:
+            return []
+        
+        features = np.empty((len(contexts), 7), dtype=np.float64)
+        for row, context in enumerate(contexts):
+            self._extract_features(context, features[row])
+        
+        if NUMBA_AVAILABLE:
+            aggregates = _aggregate_scores(features, self._weights_vec)
+            business_impact, cost_impact, sla_risk = aggregates[:, 0], aggregates[:, 1], aggregates[:, 2]
+        else:
+            business_impact = (features * self._weights_vec).sum(axis=1)
+            cost_impact = features[:, 0] * features[:, 3] * features[:, 2]
+            sla_risk = features[:, 1] * features[:, 4]
+        
         return [
-            self._score_severity(context.alert.severity),
-            context.alert.cascade_risk,
-            self._score_client_tier(context.client_tier),
-            1.0 if context.business_hours else 0.0,
-            self._score_system_criticality(context.alert.system, context.client),
-            self._score_historical_frequency(context.alert, context.historical_patterns),
-            min(1.0, context.current_load / 100.0)
+            {
+                'business_impact': impact,
+                'cost_impact': cost,
+                'sla_risk': risk,
+                'feature_scores': dict(zip(FEATURE_SCORE_KEYS, row))
+            }
+            for impact, cost, risk, row in zip(
+                business_impact.tolist(), cost_impact.tolist(), sla_risk.tolist(), features.tolist()
+            )
         ]
     
-    def _score_severity(self, severity: str) -> float:
-        """Score alert severity"""
-        severity_scores = {
-            'critical': 1.0,
-            'warning': 0.7,
-            'info': 0.3,
-            'low': 0.1
-        }
-        return severity_scores.get(severity, 0.5)
+    def _extract_features(self, context: DecisionContext, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Extract the numerical feature vector from context (compiled kernel over integer codes)
+        
+        Writes into out when given (a scratch row or a batch matrix row) instead
+        of allocating a new vector.
+        """
+        return _compute_feature_vector(
+            np.empty(7) if out is None else out,
+            self._severity_code(context.alert.severity),
+            context.alert.cascade_risk,
+            self._tier_code(context.client_tier),
+            context.business_hours,
+            self._system_criticality_code(context.alert.system, context.client),
+            self._historical_count(context.alert, context.pattern_index),
+            context.current_load
+        )
     
-    def _score_client_tier(self, tier: str) -> float:
-        """Score client tier importance"""
-        tier_scores = {
-            'enterprise': 1.0,
-            'premium': 0.8,
-            'standard': 0.6,
-            'basic': 0.4
-        }
-        return tier_scores.get(tier.lower(), 0.5)
+    def _severity_code(self, severity: str) -> int:
+        """Encode alert severity for the score table"""
+        return SEVERITY_CODES.get(severity, len(SEVERITY_CODES))
+    
+    def _tier_code(self, tier: str) -> int:
+        """Encode client tier for the score table"""
+        code = TIER_CODES.get(tier)
+        if code is None:
+            # Only mixed-case tier names pay for lower()
+            code = TIER_CODES.get(tier.lower(), len(TIER_CODES))
+        return code
     
-    def _score_system_criticality(self, system: str, client: Client) -> float:
-        """Score system criticality based on client dependencies"""
-        if system in client.critical_systems:
-            return 1.0
+    def _system_criticality_code(self, system: str, client: Client) -> int:
+        """Encode system criticality based on client dependencies"""
+        _, critical_systems, dependency_counts = self._client_profile(client)
+        if system in critical_systems:
+            return 0
         
         # Check if system has many dependencies
-        dependencies = client.system_dependencies.get(system, [])
-        if len(dependencies) > 2:
-            return 0.8
-        elif len(dependencies) > 0:
-            return 0.6
+        dependency_count = dependency_counts.get(system, 0)
+        if dependency_count > 2:
+            return 1
+        elif dependency_count > 0:
+            return 2
         else:
-            return 0.4
+            return 3
     
-    def _score_historical_frequency(self, alert: Alert, patterns: List[Dict]) -> float:
-        """Score based on historical frequency of similar alerts"""
-        similar_count = 0
-        for pattern in patterns:
-            if (pattern.get('alert_category') == alert.category and 
-                pattern.get('severity') == alert.severity):
-                similar_count += 1
-        
-        # Normalize to 0-1 scale
-        return min(1.0, similar_count / 10.0)
+    def _client_profile(self, client: Client) -> Tuple[Client, FrozenSet[str], Dict[str, int]]:
+        """
+        Criticality lookups for a client, built once per client object
+        
+        Clients are loaded once and reused across alerts; a different object
+        under the same id (a reloaded client) rebuilds the profile.
+        """
+        profile = self._client_profiles.get(client.id)
+        if profile is None or profile[0] is not client:
+            profile = (
+                client,
+                frozenset(client.critical_systems),
+                {system: len(dependencies) for system, dependencies in client.system_dependencies.items()}
+            )
+            self._client_profiles[client.id] = profile
+        return profile
+    
+    def _historical_count(self, alert: Alert, pattern_index: Dict[Tuple[str, str], int]) -> int:
+        """Count historical patterns similar to the alert (normalized by the kernel)"""
+        return pattern_index.get((alert.category, alert.severity), 0)
 
 class AutonomousDecisionAgent:
     """
@@ -234,6 +383,10 @@ class AutonomousDecisionAgent:
     Fallback: Deterministic scorer for core ranking + small LLM for explanation
     """
     
+    # LLM reasoning reused across decisions with the same quantized context
+    LLM_CACHE_SIZE = 2048
+    LLM_CACHE_TTL_SECONDS = 3600.0
+    
     def __init__(self, api_key: Optional[str] = None):
         self.name = "autonomous_decision_agent"
         self.version = "2.0.0"
@@ -241,6 +394,10 @@ class AutonomousDecisionAgent:
         # Initialize deterministic scorer
         self.scorer = DeterministicScorer()
         
+        # Reasoning cache (key -> (stored_at, text)) and requests currently in flight
+        self._reasoning_cache: "OrderedDict[Tuple, Tuple[float, str]]" = OrderedDict()
+        self._reasoning_in_flight: Dict[Tuple, asyncio.Future] = {}
+        
         # Initialize LLM with graceful fallback
         self.llm = None
         self.llm_available = False
@@ -284,79 +441,109 @@ class AutonomousDecisionAgent:
         2. LLM for reasoning and explanation
         """
         try:
-            # Step 1: Get deterministic scores
-            scores = self.scorer.score_decision(context)
-            
-            # Step 2: Determine decision type based on scores
-            decision_type = self._determine_decision_type(scores)
-            priority = self._determine_priority(scores, decision_type)
-            
-            # Step 3: Get LLM reasoning if available
-            reasoning = ""
-            fallback_used = False
-            
-            if self.llm_available:
-                try:
-                    reasoning = await self._get_llm_reasoning(context, scores, decision_type)
-                except Exception as llm_error:
-                    logger.warning(f"LLM reasoning failed, using fallback: {llm_error}")
-                    reasoning = self._get_fallback_reasoning(context, scores, decision_type)
-                    fallback_used = True
-            else:
-                reasoning = self._get_fallback_reasoning(context, scores, decision_type)
-                fallback_used = True
-            
-            # Step 4: Generate recommended actions
-            actions = self._generate_actions(decision_type, context, scores)
-            
-            # Step 5: Calculate execution metrics
-            execution_time = self._estimate_execution_time(actions, context)
-            success_probability = self._estimate_success_probability(actions, scores)
-            
-            return DecisionResult(
-                decision=decision_type,
-                priority=priority,
-                confidence=scores['business_impact'],
-                reasoning=reasoning,
-                business_impact_score=scores['business_impact'],
-                cost_impact_score=scores['cost_impact'],
-                sla_risk_score=scores['sla_risk'],
-                recommended_actions=actions,
-                estimated_execution_time=execution_time,
-                success_probability=success_probability,
-                fallback_used=fallback_used
-            )
+            # Step 1: Get deterministic scores (off the event loop, so concurrent
+            # decisions keep their LLM calls moving; scratch buffers are per thread)
+            scores = await asyncio.to_thread(self.scorer.score_decision, context)
+            return await self._decide(context, scores)
             
         except Exception as e:
             logger.error(f"❌ Decision making failed: {e}")
             return self._get_emergency_decision(context)
     
-    def _determine_decision_type(self, scores: Dict[str, float]) -> DecisionType:
-        """Determine decision type based on deterministic scores"""
-        business_impact = scores['business_impact']
-        sla_risk = scores['sla_risk']
-        cost_impact = scores['cost_impact']
+    async def make_decisions(self, contexts: List[DecisionContext],
+                             concurrency_limit: int = 8) -> List[DecisionResult]:
+        """
+        Make decisions for many alerts at once
         
-        # Use ML model prediction if available
-        if scores.get('ml_decision') is not None:
-            ml_decision = scores['ml_decision']
-            decision_map = {
-                0: DecisionType.IGNORE,
-                1: DecisionType.MONITOR,
-                2: DecisionType.PREVENT,
-                3: DecisionType.ESCALATE
-            }
-            return decision_map.get(ml_decision, DecisionType.MONITOR)
-        
-        # Fallback deterministic logic
-        if sla_risk > 0.8 and business_impact > 0.7:
-            return DecisionType.ESCALATE
-        elif business_impact > 0.6 or sla_risk > 0.6:
-            return DecisionType.PREVENT
-        elif business_impact > 0.3:
-            return DecisionType.MONITOR
+        Scores the whole batch in one pass, then runs the per-alert reasoning
+        concurrently with at most concurrency_limit LLM calls in flight.
+        Results are in the order of contexts.
+        """
+        if not contexts:
+            return []
+        
+        try:
+            # Stays on the loop thread: batches are a handful of rows, so one
+            # serial kernel call is cheaper than a thread hand-off
+            all_scores = self.scorer.score_decisions_batch(contexts)
+        except Exception as e:
+            logger.error(f"❌ Batch scoring failed: {e}")
+            return [self._get_emergency_decision(context) for context in contexts]
+        
+        semaphore = asyncio.Semaphore(concurrency_limit)
+        
+        async def decide(context: DecisionContext, scores: Dict[str, float]) -> DecisionResult:
+            try:
+                return await self._decide(context, scores, semaphore)
+            except Exception as e:
+                logger.error(f"❌ Decision making failed: {e}")
+                return self._get_emergency_decision(context)
+        
+        return list(await asyncio.gather(*(
+            decide(context, scores) for context, scores in zip(contexts, all_scores)
+        )))
+    
+    async def _decide(self, context: DecisionContext, scores: Dict[str, float],
+                      semaphore: Optional[asyncio.Semaphore] = None) -> DecisionResult:
+        """Turn deterministic scores into a decision with reasoning and actions"""
+        # Step 2: Determine decision type based on scores
+        decision_type = self._determine_decision_type(scores)
+        priority = self._determine_priority(scores, decision_type)
+        
+        # Steps 3-5: LLM reasoning (if available), recommended actions and
+        # execution metrics. Actions don't depend on the reasoning, so they are
+        # planned while the Gemini request is in flight.
+        if self.llm_available:
+            (reasoning, fallback_used), (actions, execution_time, success_probability) = await asyncio.gather(
+                self._get_reasoning(context, scores, decision_type, semaphore),
+                asyncio.to_thread(self._plan_actions, decision_type, context, scores)
+            )
         else:
-            return DecisionType.IGNORE
+            reasoning, fallback_used = await self._get_reasoning(context, scores, decision_type, semaphore)
+            actions, execution_time, success_probability = self._plan_actions(decision_type, context, scores)
+        
+        return DecisionResult(
+            decision=decision_type,
+            priority=priority,
+            confidence=scores['business_impact'],
+            reasoning=reasoning,
+            business_impact_score=scores['business_impact'],
+            cost_impact_score=scores['cost_impact'],
+            sla_risk_score=scores['sla_risk'],
+            recommended_actions=actions,
+            estimated_execution_time=execution_time,
+            success_probability=success_probability,
+            fallback_used=fallback_used
+        )
+    
+    async def _get_reasoning(self, context: DecisionContext, scores: Dict[str, float],
+                             decision_type: DecisionType,
+                             semaphore: Optional[asyncio.Semaphore] = None) -> Tuple[str, bool]:
+        """Return (reasoning, fallback_used): LLM reasoning if available, deterministic otherwise"""
+        if self.llm_available:
+            try:
+                if semaphore is None:
+                    return await self._get_llm_reasoning(context, scores, decision_type), False
+                async with semaphore:
+                    return await self._get_llm_reasoning(context, scores, decision_type), False
+            except Exception as llm_error:
+                logger.warning(f"LLM reasoning failed, using fallback: {llm_error}")
+        
+        return self._get_fallback_reasoning(context, scores, decision_type), True
+    
+    def _plan_actions(self, decision_type: DecisionType, context: DecisionContext,
+                      scores: Dict[str, float]) -> Tuple[Tuple[str, ...], int, float]:
+        """Recommended actions with their estimated execution time and success probability"""
+        actions = self._generate_actions(decision_type, context, scores)
+        execution_time = self._estimate_execution_time(actions, context)
+        success_probability = self._estimate_success_probability(actions, scores)
+        return actions, execution_time, success_probability
+    
+    def _determine_decision_type(self, scores: Dict[str, float]) -> DecisionType:
+        """Determine decision type by looking up the bucketed scores in RULE_TABLE"""
+        impact_bucket = min(max(int(scores['business_impact'] * RULE_BUCKETS), 0), RULE_BUCKETS - 1)
+        sla_bucket = min(max(int(scores['sla_risk'] * RULE_BUCKETS), 0), RULE_BUCKETS - 1)
+        return RULE_DECISIONS[RULE_TABLE[impact_bucket, sla_bucket]]
     
     def _determine_priority(self, scores: Dict[str, float], decision_type: DecisionType) -> ActionPriority:
         """Determine action priority based on scores and decision type"""
@@ -374,34 +561,80 @@ class AutonomousDecisionAgent:
     
     async def _get_llm_reasoning(self, context: DecisionContext, scores: Dict[str, float], 
                                 decision_type: DecisionType) -> str:
-        """Get reasoning from Gemini 1.5 Pro"""
-        
-        prompt = f"""
-        You are an autonomous decision agent for IT infrastructure management.
-        
-        ALERT CONTEXT:
-        - System: {context.alert.system}
-        - Severity: {context.alert.severity}
-        - Message: {context.alert.message}
-        - Cascade Risk: {context.alert.cascade_risk}
-        - Client: {context.client.name} (Tier: {context.client_tier})
-        - Business Hours: {context.business_hours}
+        """
+        Get reasoning from Gemini 1.5 Pro, cached per client and exact prompt
         
-        DETERMINISTIC SCORES:
-        - Business Impact: {scores['business_impact']:.2f}
-        - Cost Impact: {scores['cost_impact']:.2f}
-        - SLA Risk: {scores['sla_risk']:.2f}
+        The prompt quotes the client name and alert message verbatim, so an
+        entry is only ever served for the same client and the same rendered
+        context. Concurrent requests for the same key share one API call.
+        """
+        prompt = self._build_reasoning_prompt(context, scores, decision_type)
+        key = (context.client.id, hashlib.blake2b(prompt.encode(), digest_size=16).digest())
         
-        DECISION: {decision_type.value.upper()}
+        cached = self._reasoning_cache.get(key)
+        if cached and time.monotonic() - cached[0] <= self.LLM_CACHE_TTL_SECONDS:
+            self._reasoning_cache.move_to_end(key)
+            return cached[1]
         
-        Provide a concise 2-3 sentence explanation of why this decision was made,
-        focusing on business impact, cost considerations, and SLA risks.
-        Be specific about the factors that influenced this decision.
-        """
+        in_flight = self._reasoning_in_flight.get(key)
+        if in_flight is not None:
+            return await asyncio.shield(in_flight)
         
+        future = asyncio.get_running_loop().create_future()
+        self._reasoning_in_flight[key] = future
         try:
-            response = await self.llm.generate_content_async(prompt)
-            return response.text.strip()
+            reasoning = await self._request_llm_reasoning(prompt)
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception()  # waiters re-raise it; don't warn if there are none
+            raise
+        finally:
+            del self._reasoning_in_flight[key]
+        
+        future.set_result(reasoning)
+        self._reasoning_cache[key] = (time.monotonic(), reasoning)
+        self._reasoning_cache.move_to_end(key)
+        while len(self._reasoning_cache) > self.LLM_CACHE_SIZE:
+            self._reasoning_cache.popitem(last=False)
+        return reasoning
+    
+    def _build_reasoning_prompt(self, context: DecisionContext, scores: Dict[str, float],
+                                decision_type: DecisionType) -> str:
+        """Render the reasoning prompt for one decision"""
+        return PROMPT_TMPL.format_map({
+            'system': context.alert.system,
+            'severity': context.alert.severity,
+            'message': context.alert.message,
+            'cascade_risk': context.alert.cascade_risk,
+            'client_name': context.client.name,
+            'client_tier': context.client_tier,
+            'business_hours': context.business_hours,
+            'business_impact': scores['business_impact'],
+            'cost_impact': scores['cost_impact'],
+            'sla_risk': scores['sla_risk'],
+            'decision': decision_type.value.upper()
+        })
+    
+    async def _request_llm_reasoning(self, prompt: str) -> str:
+        """Ask Gemini for the decision explanation"""
+        try:
+            response = await self.llm.generate_content_async(
+                prompt,
+                stream=True,
+                generation_config={"max_output_tokens": REASONING_MAX_OUTPUT_TOKENS}
+            )
+            text = ""
+            async for chunk in response:
+                text += chunk.text
+                sentence_ends = [match.end() for match in _SENTENCE_END_RE.finditer(text)]
+                if len(sentence_ends) >= REASONING_MAX_SENTENCES:
+                    # Enough for the explanation; stop reading the stream
+                    text = text[:sentence_ends[REASONING_MAX_SENTENCES - 1]]
+                    break
+            return text.strip()
         except Exception as e:
             logger.error(f"LLM reasoning error: {e}")
             raise
@@ -437,50 +670,21 @@ class AutonomousDecisionAgent:
     
     
     def _generate_actions(self, decision_type: DecisionType, context: DecisionContext, 
-                         scores: Dict[str, float]) -> List[str]:
+                         scores: Dict[str, float]) -> Tuple[str, ...]:
         """Generate recommended actions based on decision type"""
         
-        actions = []
+        system = context.alert.system
+        system_actions = SYSTEM_ACTIONS.get(system)
+        if system_actions is None:
+            system_actions = WEB_SYSTEM_ACTIONS if "web" in system else ()
         
-        if decision_type == DecisionType.ESCALATE:
-            actions.extend([
-                "Immediately notify senior technician",
-                "Activate emergency response protocol",
-                "Begin client communication",
-                "Prepare rollback procedures"
-            ])
-        elif decision_type == DecisionType.PREVENT:
-            actions.extend([
-                "Scale affected system resources",
-                "Enable automated failover",
-                "Clear system bottlenecks",
-                "Monitor cascade indicators"
-            ])
-        elif decision_type == DecisionType.MONITOR:
-            actions.extend([
-                "Increase monitoring frequency",
-                "Set up alert thresholds",
-                "Document incident pattern",
-                "Prepare response plan"
-            ])
-        else:  # IGNORE
-            actions.extend([
-                "Log for pattern analysis",
-                "Continue standard monitoring",
-                "Update noise filters"
-            ])
-        
-        # Add system-specific actions
-        if context.alert.system == "database":
-            actions.append("Check connection pool status")
-        elif context.alert.system == "network-gateway":
-            actions.append("Verify routing tables")
-        elif "web" in context.alert.system:
-            actions.append("Check application health")
-        
-        return actions[:4]  # Limit to 4 actions
+        base_actions = BASE_ACTIONS[decision_type]
+        if not system_actions or len(base_actions) >= MAX_RECOMMENDED_ACTIONS:
+            # Shared module-level tuple, no allocation
+            return base_actions[:MAX_RECOMMENDED_ACTIONS]
+        return (base_actions + system_actions)[:MAX_RECOMMENDED_ACTIONS]
     
-    def _estimate_execution_time(self, actions: List[str], context: DecisionContext) -> int:
+    def _estimate_execution_time(self, actions: Tuple[str, ...], context: DecisionContext) -> int:
         """Estimate execution time in minutes"""
         base_time = len(actions) * 2  # 2 minutes per action
         
@@ -496,7 +700,7 @@ class AutonomousDecisionAgent:
         
         return max(1, base_time)
     
-    def _estimate_success_probability(self, actions: List[str], scores: Dict[str, float]) -> float:
+    def _estimate_success_probability(self, actions: Tuple[str, ...], scores: Dict[str, float]) -> float:
         """Estimate success probability of actions"""
         base_probability = 0.8
         
@@ -522,7 +726,7 @@ class AutonomousDecisionAgent:
             business_impact_score=0.5,
             cost_impact_score=0.5,
             sla_risk_score=0.5,
-            recommended_actions=["Manual review required", "Monitor system status"],
+            recommended_actions=EMERGENCY_ACTIONS,
             estimated_execution_time=5,
             success_probability=0.7,
             fallback_used=True
@@ -535,7 +739,7 @@ class AutonomousDecisionAgent:
             "version": self.version,
             "capabilities": [
                 "deterministic_business_scoring",
-                "ml_decision_prediction" if SKLEARN_AVAILABLE else "fallback_scoring",
+                "rule_table_decisions",
                 "llm_reasoning" if self.llm_available else "fallback_reasoning",
                 "autonomous_decision_making",
                 "business_impact_analysis",
@@ -544,8 +748,8 @@ class AutonomousDecisionAgent:
             ],
             "models_loaded": {
                 "gemini_1_5_pro": self.llm_available,
-                "scikit_learn": SKLEARN_AVAILABLE,
+                "decision_rule_table": True,
                 "deterministic_scorer": True
             },
-            "status": "ready" if (self.llm_available or SKLEARN_AVAILABLE) else "degraded"
+            "status": "ready"
         }
@@ -1,11 +1,74 @@
 import json
-import random
-from typing import List, Dict, Optional
+import re
+from collections import defaultdict
+from functools import lru_cache
+from typing import List, Dict, FrozenSet, Optional, Pattern, Tuple
 from datetime import datetime, timedelta
-from app.models.alert import Alert, CascadePrediction, Client
+import numpy as np
+from app.models.alert import Alert, CascadePrediction, Client, SeverityLevel
+
+
+@lru_cache(maxsize=256)
+def _trigger_substrings(trigger: str) -> FrozenSet[str]:
+    """Every non-empty substring of a trigger; a word lies inside the trigger iff it is in this set"""
+    return frozenset(
+        trigger[start:end]
+        for start in range(len(trigger))
+        for end in range(start + 1, len(trigger) + 1)
+    )
+
+
+@lru_cache(maxsize=4096)
+def _trigger_hits(
+    message: str, pattern_triggers: Tuple[Tuple[str, ...], ...]
+) -> Tuple[Tuple[int, ...], Tuple[int, ...]]:
+    """Count trigger hits per pattern for one message in a single pass over its words.
+
+    The first tuple counts triggers that contain or are contained in a message word,
+    the second only triggers that contain a message word. Both directions are set
+    or substring lookups: a trigger without whitespace can only occur inside a
+    single word, so searching the lowered message once covers every word.
+    """
+    lowered = message.lower()
+    words = set(lowered.split())
+    either, within = [], []
+    for triggers in pattern_triggers:
+        either_count = within_count = 0
+        for trigger in triggers:
+            if not _trigger_substrings(trigger).isdisjoint(words):
+                either_count += 1
+                within_count += 1
+            elif words and (trigger in lowered if trigger.split() == [trigger]
+                            else any(trigger in word for word in words)):
+                either_count += 1
+        either.append(either_count)
+        within.append(within_count)
+    return tuple(either), tuple(within)
+
+
+@lru_cache(maxsize=64)
+def _trigger_regex(triggers: Tuple[str, ...]) -> Pattern:
+    """One alternation per trigger list, so a text is searched once instead of per trigger"""
+    if not triggers:
+        return re.compile(r"(?!)")
+    return re.compile("|".join(map(re.escape, triggers)))
+
+
+def dependents_index(system_dependencies: Dict[str, List[str]]) -> Dict[str, List[str]]:
+    """Reverse dependency map: system -> systems that depend on it, in declaration order"""
+    dependents: Dict[str, List[str]] = {}
+    for sys, deps in system_dependencies.items():
+        for dep in dict.fromkeys(deps):
+            dependents.setdefault(dep, []).append(sys)
+    return dependents
+
 
 class CascadePredictionEngine:
-    def __init__(self):
+    def __init__(self, seed: Optional[int] = None):
+        # Jitter for cascade and resolution times; seed it for reproducible predictions
+        self._rng = np.random.default_rng(seed)
+        # (historical_patterns list, its length, (category, severity) index, insights by key)
+        self._hp_index_cache: Optional[Tuple[List[Dict], int, Dict[Tuple, List[Dict]], Dict[Tuple, Dict]]] = None
         self.cascade_patterns = {
             "database_performance_cascade": {
                 "triggers": ["cpu_high", "memory_warning", "slow_query"],
@@ -48,10 +111,19 @@ class CascadePredictionEngine:
     def predict_cascade(self, alerts: List[Alert], client: Client) -> List[CascadePrediction]:
         predictions = []
         processed_patterns = set()  # Track patterns to avoid duplicates
+        recent_matches = self._recent_trigger_matches(alerts)
+        dependents = dependents_index(client.system_dependencies)
         
-        for alert in alerts:
-            if alert.severity in ["critical", "warning"]:
-                prediction = self._analyze_single_alert(alert, client, alerts)
+        # Per-alert time jitter, drawn in one batch instead of one call per alert
+        cascade_offsets = self._rng.integers(-2, 6, size=len(alerts)).tolist()
+        fallback_times = self._rng.integers(8, 26, size=len(alerts)).tolist()
+        
+        for index, alert in enumerate(alerts):
+            if alert.severity in (SeverityLevel.CRITICAL, SeverityLevel.WARNING):
+                prediction = self._analyze_single_alert(
+                    alert, client, alerts, recent_matches, dependents,
+                    (cascade_offsets[index], fallback_times[index])
+                )
                 if prediction and prediction.prediction_confidence > 0.5:
                     # Only add if we haven't seen this pattern recently
                     pattern_key = f"{prediction.pattern_matched}_{alert.system}"
@@ -61,23 +133,34 @@ class CascadePredictionEngine:
         
         # If we have fewer than 3 predictions, generate additional diverse ones
         if len(predictions) < 3:
-            additional_predictions = self._generate_additional_predictions(alerts, client, predictions)
+            additional_predictions = self._generate_additional_predictions(alerts, client, predictions, dependents)
             predictions.extend(additional_predictions)
         
         return predictions[:4]  # Limit to 4 predictions max
     
-    def _analyze_single_alert(self, alert: Alert, client: Client, all_alerts: List[Alert]) -> Optional[CascadePrediction]:
+    def _analyze_single_alert(
+        self,
+        alert: Alert,
+        client: Client,
+        all_alerts: List[Alert],
+        recent_matches: Optional[Tuple[int, ...]] = None,
+        dependents: Optional[Dict[str, List[str]]] = None,
+        time_jitter: Optional[Tuple[int, int]] = None
+    ) -> Optional[CascadePrediction]:
         # Check for pattern matching
-        matched_pattern = self._match_cascade_pattern(alert, all_alerts)
+        matched_pattern = self._match_cascade_pattern(alert, all_alerts, recent_matches)
+        if time_jitter is None:
+            time_jitter = (int(self._rng.integers(-2, 6)), int(self._rng.integers(8, 26)))
+        cascade_offset, fallback_time = time_jitter
         
         if matched_pattern:
             pattern_data = self.cascade_patterns[matched_pattern]
             
             # Calculate cascade risk based on system dependencies
-            affected_systems = self._get_dependent_systems(alert.system, client)
+            affected_systems = self._get_dependent_systems(alert.system, client, dependents)
             
             # Estimate time to cascade
-            time_to_cascade = pattern_data["time_windows"][0] + random.randint(-2, 5)
+            time_to_cascade = pattern_data["time_windows"][0] + cascade_offset
             
             # Estimate resolution time based on pattern complexity
             resolution_time = self._estimate_resolution_time(matched_pattern, len(affected_systems))
@@ -94,10 +177,10 @@ class CascadePredictionEngine:
             )
         
         # Fallback: Basic dependency-based prediction
-        if alert.severity == "critical":
-            affected_systems = self._get_dependent_systems(alert.system, client)
+        if alert.severity is SeverityLevel.CRITICAL:
+            affected_systems = self._get_dependent_systems(alert.system, client, dependents)
             if affected_systems:
-                time_to_cascade = random.randint(8, 25)
+                time_to_cascade = fallback_time
                 resolution_time = self._estimate_resolution_time("dependency_based_fallback", len(affected_systems))
                 
                 return CascadePrediction(
@@ -113,13 +196,20 @@ class CascadePredictionEngine:
         
         return None
     
-    def _generate_additional_predictions(self, alerts: List[Alert], client: Client, existing_predictions: List[CascadePrediction]) -> List[CascadePrediction]:
+    def _generate_additional_predictions(
+        self,
+        alerts: List[Alert],
+        client: Client,
+        existing_predictions: List[CascadePrediction],
+        dependents: Optional[Dict[str, List[str]]] = None
+    ) -> List[CascadePrediction]:
         """Generate additional diverse predictions to reach minimum count"""
         additional = []
         existing_patterns = {p.pattern_matched for p in existing_predictions}
         
         # Available patterns that haven't been used
         available_patterns = [p for p in self.cascade_patterns.keys() if p not in existing_patterns]
+        relevant_alerts = self._first_relevant_alerts(alerts, available_patterns[:3])
         
         # Generate predictions for unused patterns
         for i, pattern_name in enumerate(available_patterns[:3]):
@@ -129,25 +219,21 @@ class CascadePredictionEngine:
             pattern_data = self.cascade_patterns[pattern_name]
             
             # Find a relevant alert for this pattern
-            relevant_alert = None
-            for alert in alerts:
-                if self._is_alert_relevant_to_pattern(alert, pattern_name):
-                    relevant_alert = alert
-                    break
+            relevant_alert = relevant_alerts.get(pattern_name)
             
             if not relevant_alert:
                 # Use first available alert
                 relevant_alert = alerts[0] if alerts else None
             
             if relevant_alert:
-                affected_systems = self._get_dependent_systems(relevant_alert.system, client)
-                time_to_cascade = pattern_data["time_windows"][0] + random.randint(-2, 5)
+                affected_systems = self._get_dependent_systems(relevant_alert.system, client, dependents)
+                time_to_cascade = pattern_data["time_windows"][0] + int(self._rng.integers(-2, 6))
                 resolution_time = self._estimate_resolution_time(pattern_name, len(affected_systems))
                 
                 prediction = CascadePrediction(
                     alert_id=relevant_alert.id,
                     client_id=relevant_alert.client_id,
-                    prediction_confidence=pattern_data["confidence"] - random.uniform(0.1, 0.2),
+                    prediction_confidence=pattern_data["confidence"] - float(self._rng.uniform(0.1, 0.2)),
                     predicted_cascade_systems=affected_systems[:3],
                     time_to_cascade_minutes=time_to_cascade,
                     resolution_time_minutes=resolution_time,
@@ -158,6 +244,23 @@ class CascadePredictionEngine:
         
         return additional
     
+    def _first_relevant_alerts(self, alerts: List[Alert], pattern_names: List[str]) -> Dict[str, Alert]:
+        """First alert relevant to each pattern, lowercasing every alert's text once"""
+        pending = {
+            name: _trigger_regex(tuple(self.cascade_patterns[name]["triggers"]))
+            for name in pattern_names
+        }
+        relevant = {}
+        for alert in alerts:
+            if not pending:
+                break
+            alert_text = f"{alert.system} {alert.message}".lower()
+            for pattern_name, trigger_regex in list(pending.items()):
+                if trigger_regex.search(alert_text):
+                    relevant[pattern_name] = alert
+                    del pending[pattern_name]
+        return relevant
+    
     def _is_alert_relevant_to_pattern(self, alert: Alert, pattern_name: str) -> bool:
         """Check if an alert is relevant to a specific pattern"""
         pattern_data = self.cascade_patterns[pattern_name]
@@ -165,40 +268,56 @@ class CascadePredictionEngine:
         
         # Check if alert system or message contains trigger keywords
         alert_text = f"{alert.system} {alert.message}".lower()
-        return any(trigger in alert_text for trigger in triggers)
+        return _trigger_regex(tuple(triggers)).search(alert_text) is not None
+    
+    def _pattern_triggers(self) -> Tuple[Tuple[str, ...], ...]:
+        return tuple(tuple(pattern["triggers"]) for pattern in self.cascade_patterns.values())
+    
+    def _recent_trigger_matches(self, all_alerts: List[Alert]) -> Tuple[int, ...]:
+        """Per-pattern trigger matches contributed by alerts from the last 30 minutes"""
+        pattern_triggers = self._pattern_triggers()
+        totals = [0] * len(pattern_triggers)
+        now = datetime.now()
+        cutoff = now - timedelta(minutes=30)
+        for recent_alert in all_alerts:
+            if cutoff < recent_alert.timestamp <= now:
+                _, within = _trigger_hits(recent_alert.message, pattern_triggers)
+                for index, count in enumerate(within):
+                    totals[index] += count
+        return tuple(totals)
     
-    def _match_cascade_pattern(self, alert: Alert, all_alerts: List[Alert]) -> Optional[str]:
-        alert_keywords = alert.message.lower().split()
+    def _match_cascade_pattern(
+        self,
+        alert: Alert,
+        all_alerts: List[Alert],
+        recent_matches: Optional[Tuple[int, ...]] = None
+    ) -> Optional[str]:
+        # Recent-alert matches do not depend on the alert being matched, so callers
+        # scanning a whole batch compute them once and pass them in
+        if recent_matches is None:
+            recent_matches = self._recent_trigger_matches(all_alerts)
+        either, _ = _trigger_hits(alert.message, self._pattern_triggers())
         
-        for pattern_name, pattern_data in self.cascade_patterns.items():
-            trigger_matches = 0
-            for trigger in pattern_data["triggers"]:
-                if any(keyword in trigger for keyword in alert_keywords) or any(trigger in keyword for keyword in alert_keywords):
-                    trigger_matches += 1
-            
-            # Check if we have related alerts that match this pattern
-            recent_alerts = [a for a in all_alerts if (datetime.now() - a.timestamp).seconds < 1800]  # Last 30 minutes
-            for recent_alert in recent_alerts:
-                recent_keywords = recent_alert.message.lower().split()
-                for trigger in pattern_data["triggers"]:
-                    if any(keyword in trigger for keyword in recent_keywords):
-                        trigger_matches += 1
-            
-            if trigger_matches >= 2:
+        for pattern_name, own, recent in zip(self.cascade_patterns, either, recent_matches):
+            if own + recent >= 2:
                 return pattern_name
         
         return None
     
-    def _get_dependent_systems(self, system: str, client: Client) -> List[str]:
+    def _get_dependent_systems(
+        self,
+        system: str,
+        client: Client,
+        dependents: Optional[Dict[str, List[str]]] = None
+    ) -> List[str]:
         dependencies = client.system_dependencies.get(system, [])
         
-        # Add some intelligence - systems that depend on this system
-        dependent_systems = []
-        for sys, deps in client.system_dependencies.items():
-            if system in deps:
-                dependent_systems.append(sys)
+        # Add some intelligence - systems that depend on this system. Batch callers
+        # pass the reverse index built once per client instead of rescanning
+        if dependents is None:
+            dependents = dependents_index(client.system_dependencies)
         
-        return dependencies + dependent_systems
+        return dependencies + dependents.get(system, [])
     
     def _estimate_resolution_time(self, pattern_name: str, affected_systems_count: int) -> int:
         """Estimate resolution time based on pattern complexity and affected systems"""
@@ -231,29 +350,48 @@ class CascadePredictionEngine:
         estimated_time = int(base_time * multiplier)
         variation = int(estimated_time * 0.2)
         
-        return max(15, estimated_time + random.randint(-variation, variation))
+        return max(15, estimated_time + int(self._rng.integers(-variation, variation + 1)))
     
+    def _historical_pattern_index(
+        self, historical_patterns: List[Dict]
+    ) -> Tuple[Dict[Tuple, List[Dict]], Dict[Tuple, Dict]]:
+        """Group historical patterns by (category, severity), rebuilt only when the list changes"""
+        cached = self._hp_index_cache
+        if cached is not None and cached[0] is historical_patterns and cached[1] == len(historical_patterns):
+            return cached[2], cached[3]
+
+        index: Dict[Tuple, List[Dict]] = defaultdict(list)
+        for pattern in historical_patterns:
+            index[(pattern.get("alert_category"), pattern.get("severity"))].append(pattern)
+        self._hp_index_cache = (historical_patterns, len(historical_patterns), index, {})
+        return index, self._hp_index_cache[3]
+
     def get_cross_client_insights(self, current_alert: Alert, historical_patterns: List[Dict]) -> Dict:
         """Analyze patterns across multiple clients"""
-        similar_patterns = []
-        
-        for pattern in historical_patterns:
-            if (pattern.get("alert_category") == current_alert.category and 
-                pattern.get("severity") == current_alert.severity):
-                similar_patterns.append(pattern)
+        # Enum members hash and compare like their values, so they find the string keys
+        key = (current_alert.category, current_alert.severity)
+        index, insights = self._historical_pattern_index(historical_patterns)
+        if key in insights:
+            insight = insights[key]
+            return {**insight, "commonly_affected_systems": list(insight["commonly_affected_systems"])}
+
+        similar_patterns = index.get(key, [])
         
         if similar_patterns:
             avg_cascade_time = sum(p.get("cascade_time_minutes", 15) for p in similar_patterns) / len(similar_patterns)
-            common_affected_systems = []
-            
-            for pattern in similar_patterns[:3]:  # Top 3 similar cases
-                common_affected_systems.extend(pattern.get("affected_systems", []))
+            # Distinct systems of the top 3 similar cases, in first-seen order
+            common_affected_systems = dict.fromkeys(
+                system
+                for pattern in similar_patterns[:3]
+                for system in pattern.get("affected_systems", [])
+            )
             
-            return {
+            insights[key] = {
                 "similar_incidents_count": len(similar_patterns),
                 "average_cascade_time": int(avg_cascade_time),
-                "commonly_affected_systems": list(set(common_affected_systems)),
+                "commonly_affected_systems": list(common_affected_systems),
                 "confidence": min(0.9, len(similar_patterns) / 10)  # Higher confidence with more historical data
             }
+            return {**insights[key], "commonly_affected_systems": list(common_affected_systems)}
         
         return {"similar_incidents_count": 0, "average_cascade_time": 15, "commonly_affected_systems": [], "confidence": 0.3}
\ No newline at end of file
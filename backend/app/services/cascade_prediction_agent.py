@@ -2,12 +2,14 @@ import asyncio
 import json
 import logging
 import traceback
+from itertools import chain
+from statistics import fmean
 from typing import List, Dict, Optional, Any
 from datetime import datetime, timedelta
 import httpx
 import google.generativeai as genai
 from google.api_core import exceptions as google_exceptions
-from app.models.alert import Alert, Client, CascadePrediction
+from app.models.alert import Alert, Client, CascadePrediction, SeverityLevel
 from app.services.cascade_prediction import CascadePredictionEngine
 
 # Configure logging
@@ -403,7 +405,7 @@ Focus on temporal patterns, system dependencies, and prevention effectiveness.
         # Enhanced prevention actions
         prevention_actions = engine_output.get("prevention_actions", [])
         llm_actions = llm_reasoning.get("recommended_immediate_actions", [])
-        combined_actions = list(set(prevention_actions + llm_actions))
+        combined_actions = list(dict.fromkeys(chain(prevention_actions, llm_actions)))
         
         # Determine urgency
         urgency = llm_reasoning.get("urgency_level", "medium")
@@ -677,10 +679,10 @@ Respond in JSON format:
         # Handle both Alert objects and dictionaries
         if alerts and isinstance(alerts[0], dict):
             critical_count = len([a for a in alerts if a.get("severity") == "critical"])
-            avg_cascade_risk = sum(a.get("cascade_risk", 0) for a in alerts) / len(alerts) if alerts else 0
+            avg_cascade_risk = fmean(a.get("cascade_risk", 0) for a in alerts) if alerts else 0
         else:
-            critical_count = len([a for a in alerts if a.severity == "critical"])
-            avg_cascade_risk = sum(a.cascade_risk for a in alerts) / len(alerts) if alerts else 0
+            critical_count = sum(1 for a in alerts if a.severity is SeverityLevel.CRITICAL)
+            avg_cascade_risk = fmean(a.cascade_risk for a in alerts) if alerts else 0
         
         return {
             "predicted_in": 20,
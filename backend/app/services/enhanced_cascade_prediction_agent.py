@@ -6,23 +6,39 @@ Maximizes LLM effectiveness with rich data sources and optimized prompts
 import asyncio
 import json
 import logging
+import re
+from collections import deque
+from itertools import islice
+from statistics import fmean
 from typing import List, Dict, Optional, Any
 from datetime import datetime, timedelta
 import google.generativeai as genai
 
-from app.models.alert import Alert, Client, CascadePrediction
+from app.models.alert import Alert, Client, CascadePrediction, SeverityLevel
 from app.services.cascade_prediction import CascadePredictionEngine
 from app.services.data_collection_service import DataCollectionService
 from app.services.llm_prompt_optimizer import LLMPromptOptimizer, PromptContext
 
 logger = logging.getLogger(__name__)
 
+# Pattern hints for free-text LLM responses, in priority order; one compiled
+# alternation finds every hint in a single case-insensitive scan
+TEXT_PATTERN_HINTS = (
+    ("database", "database_related_cascade"),
+    ("network", "network_related_cascade"),
+    ("storage", "storage_related_cascade"),
+    ("performance", "performance_degradation_cascade")
+)
+_TEXT_HINT_RE = re.compile("|".join(keyword for keyword, _ in TEXT_PATTERN_HINTS), re.IGNORECASE)
+
 class EnhancedCascadePredictionAgent:
     """
     Enhanced Cascade Prediction Agent with comprehensive data integration
     and optimized LLM utilization
     """
     
+    MEMORY_SIZE = 1000
+    
     def __init__(self, api_key: Optional[str] = None):
         self.name = "enhanced_cascade_prediction_agent"
         self.created_at = datetime.now()
@@ -41,7 +57,7 @@ class EnhancedCascadePredictionAgent:
         self.prompt_optimizer = LLMPromptOptimizer()
         
         # Agent memory and learning
-        self.incident_memory = []
+        self.incident_memory = deque(maxlen=self.MEMORY_SIZE)
         self.pattern_effectiveness = {}
         self.client_behavior_profiles = {}
         self.performance_metrics = {
@@ -422,12 +438,9 @@ class EnhancedCascadePredictionAgent:
             "urgency": prediction.get("urgency_level", "medium")
         }
         
+        # Bounded ring buffer: the oldest record is dropped once it is full
         self.incident_memory.append(incident_record)
         
-        # Keep memory size manageable
-        if len(self.incident_memory) > 1000:
-            self.incident_memory = self.incident_memory[-800:]
-        
         # Update pattern effectiveness
         pattern_key = prediction.get("pattern_matched", "enhanced_ai_pattern")
         if pattern_key not in self.pattern_effectiveness:
@@ -437,13 +450,20 @@ class EnhancedCascadePredictionAgent:
         if prediction.get("prevention_actions") and prediction.get("confidence", 0) > 0.7:
             self.pattern_effectiveness[pattern_key]["successful"] += 1
     
+    def recent_incidents(self, limit: int = 5) -> List[Dict[str, Any]]:
+        """Most recent incident records, oldest first"""
+        recent = list(islice(reversed(self.incident_memory), max(limit, 0)))
+        recent.reverse()
+        return recent
+    
     def _update_performance_metrics(self, prediction: Dict[str, Any]):
         """Update agent performance metrics"""
         self.performance_metrics["total_predictions"] += 1
         
+        # Incremental mean
         confidence = prediction.get("confidence", 0.0)
-        self.performance_metrics["average_confidence"] = (
-            (self.performance_metrics["average_confidence"] * (self.performance_metrics["total_predictions"] - 1) + confidence) 
+        self.performance_metrics["average_confidence"] += (
+            (confidence - self.performance_metrics["average_confidence"]) 
             / self.performance_metrics["total_predictions"]
         )
     
@@ -452,16 +472,12 @@ class EnhancedCascadePredictionAgent:
         if not self.incident_memory:
             return {"patterns_learned": 0, "confidence_improvement": 0}
         
-        client_incidents = {}
-        for incident in self.incident_memory:
-            client_id = incident["client_id"]
-            if client_id not in client_incidents:
-                client_incidents[client_id] = 0
-            client_incidents[client_id] += 1
+        # Only the number of distinct clients is reported, so no per-client counts are kept
+        clients_analyzed = len({incident["client_id"] for incident in self.incident_memory})
         
         return {
             "patterns_learned": len(self.pattern_effectiveness),
-            "clients_analyzed": len(client_incidents),
+            "clients_analyzed": clients_analyzed,
             "confidence_improvement": min(0.4, len(self.incident_memory) / 1000),
             "most_common_patterns": sorted(
                 self.pattern_effectiveness.items(), 
@@ -571,15 +587,11 @@ class EnhancedCascadePredictionAgent:
     def _parse_text_response(self, text: str) -> Dict[str, Any]:
         """Parse non-JSON LLM response"""
         # Infer pattern from text content
-        inferred_pattern = "text_parsed_pattern"
-        if "database" in text.lower():
-            inferred_pattern = "database_related_cascade"
-        elif "network" in text.lower():
-            inferred_pattern = "network_related_cascade"
-        elif "storage" in text.lower():
-            inferred_pattern = "storage_related_cascade"
-        elif "performance" in text.lower():
-            inferred_pattern = "performance_degradation_cascade"
+        found = {match.lower() for match in _TEXT_HINT_RE.findall(text)}
+        inferred_pattern = next(
+            (pattern for keyword, pattern in TEXT_PATTERN_HINTS if keyword in found),
+            "text_parsed_pattern"
+        )
         
         return {
             "predicted_in": 25,
@@ -677,10 +689,10 @@ class EnhancedCascadePredictionAgent:
         # Handle both Alert objects and dictionaries
         if alerts and isinstance(alerts[0], dict):
             critical_count = len([a for a in alerts if a.get("severity") == "critical"])
-            avg_cascade_risk = sum(a.get("cascade_risk", 0) for a in alerts) / len(alerts) if alerts else 0
+            avg_cascade_risk = fmean(a.get("cascade_risk", 0) for a in alerts) if alerts else 0
         else:
-            critical_count = len([a for a in alerts if a.severity == "critical"])
-            avg_cascade_risk = sum(a.cascade_risk for a in alerts) / len(alerts) if alerts else 0
+            critical_count = sum(1 for a in alerts if a.severity is SeverityLevel.CRITICAL)
+            avg_cascade_risk = fmean(a.cascade_risk for a in alerts) if alerts else 0
         
         # Infer pattern for fallback
         fallback_pattern = "fallback_analysis"
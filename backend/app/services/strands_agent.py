@@ -4,21 +4,66 @@ Implements multi-threaded analysis with pattern recognition and predictive model
 """
 
 import asyncio
+import copy
+import hashlib
 import json
 import logging
-import threading
-from typing import List, Dict, Optional, Any, Tuple
-from datetime import datetime, timedelta
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import time
+from collections import OrderedDict, deque
+from itertools import islice
+from statistics import fmean
+from typing import List, Dict, Any, Tuple
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 from dataclasses import dataclass
 from enum import Enum
 
-from app.models.alert import Alert, Client, CascadePrediction, SeverityLevel, AlertCategory
-from app.services.cascade_prediction import CascadePredictionEngine
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    njit = None
+
+from app.models.alert import Alert, Client, SeverityLevel, AlertCategory
+from app.services.cascade_prediction import CascadePredictionEngine, dependents_index
 
 logger = logging.getLogger(__name__)
 
+# Severity and category codes index the weight tables below; alerts carry them
+# in the per-run arrays built by _normalize_alerts. The enums are str-based, so
+# members look up these tables directly without the .value descriptor call
+SEVERITY_CODES = {"critical": 0, "warning": 1, "info": 2, "low": 3}
+SEVERITY_NAMES = tuple(SEVERITY_CODES)
+SEVERITY_WEIGHTS = np.array([4.0, 2.0, 1.0, 0.5])
+SEVERITY_FACTORS = np.array([1.0, 0.7, 0.4, 0.2])
+CATEGORY_CODES = {
+    "performance": 0, "system": 1, "storage": 2, "network": 3, "application": 4, "security": 5
+}
+CATEGORY_NAMES = tuple(CATEGORY_CODES)
+CATEGORY_RISK = np.array([0.8, 0.6, 0.7, 0.5, 0.4, 0.3])
+
+# Plain dict lookups for dict alerts; unknown values fall back to the defaults
+SEVERITY_LEVELS = {level.value: level for level in SeverityLevel}
+ALERT_CATEGORIES = {category.value: category for category in AlertCategory}
+
+
+def _weighted_risk_kernel(severity: np.ndarray, category: np.ndarray,
+                          severity_factors: np.ndarray, category_risk: np.ndarray,
+                          risks_out: np.ndarray) -> float:
+    """Fill each alert's category risk scaled by its severity factor; returns the sum"""
+    total = 0.0
+    for index in range(len(severity)):
+        risk = category_risk[category[index]] * severity_factors[severity[index]]
+        risks_out[index] = risk
+        total += risk
+    return total
+
+
+if NUMBA_AVAILABLE:
+    _weighted_risk_kernel = njit(cache=True)(_weighted_risk_kernel)
+
 class StrandType(Enum):
     """Types of analysis strands"""
     TEMPORAL = "temporal"
@@ -44,21 +89,30 @@ class StrandsAgent:
     Uses multiple parallel analysis strands to provide robust predictions
     """
     
-    def __init__(self, max_workers: int = 6):
+    RUN_CACHE_SIZE = 512
+    RUN_CACHE_TTL_SECONDS = 60.0
+    
+    def __init__(self, max_workers: int = 6, fuse_strands: bool = True, memory_size: int = 1000):
         self.name = "strands_agent"
         self.created_at = datetime.now()
         self.max_workers = max_workers
+        self.fuse_strands = fuse_strands
         
         # Initialize prediction engine
         self.prediction_engine = CascadePredictionEngine()
         
         # Agent memory and learning
-        self.incident_memory = []
+        self.incident_memory = deque(maxlen=memory_size)
         self.pattern_effectiveness = {}
         self.strand_performance = {}
         
-        # Thread pool for parallel execution
-        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        # Combined predictions of recent runs, keyed by alert set and client
+        self._run_cache: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._runs_in_flight: Dict[bytes, asyncio.Future] = {}
+        
+        # Thread pool for per-strand parallel execution; fused runs need a single
+        # worker thread each and use the loop's default executor instead
+        self.executor = None if fuse_strands else ThreadPoolExecutor(max_workers=max_workers)
         
         # Performance metrics
         self.performance_metrics = {
@@ -74,7 +128,7 @@ class StrandsAgent:
         Main execution method for strands agent
         Runs multiple analysis strands in parallel and combines results
         """
-        start_time = datetime.now()
+        start_ns = time.perf_counter_ns()
         
         try:
             # Extract data
@@ -86,42 +140,117 @@ class StrandsAgent:
                 raise ValueError("Missing required data: alerts and client")
             
             # Convert alerts to consistent format
-            alert_objects = self._normalize_alerts(alerts, client)
-            
-            # Define analysis strands
-            strands = [
-                (StrandType.TEMPORAL, self._temporal_analysis_strand),
-                (StrandType.DEPENDENCY, self._dependency_analysis_strand),
-                (StrandType.RESOURCE, self._resource_analysis_strand),
-                (StrandType.PATTERN, self._pattern_analysis_strand),
-                (StrandType.CROSS_CLIENT, self._cross_client_analysis_strand),
-                (StrandType.PREDICTIVE, self._predictive_analysis_strand)
-            ]
+            alert_objects, alert_arrays = self._normalize_alerts(alerts, client)
             
-            # Execute strands in parallel
-            strand_results = await self._execute_strands_parallel(
-                strands, alert_objects, client, historical_data
-            )
+            # Upstream correlators often resubmit the same alert set; reuse the
+            # recent result instead of running every strand again. Served runs
+            # still count towards memory and metrics like fresh ones.
+            cache_key = self._run_cache_key(alert_objects, client, historical_data)
+            cached = self._run_cache.get(cache_key)
+            if cached and time.monotonic() - cached[0] <= self.RUN_CACHE_TTL_SECONDS:
+                self._run_cache.move_to_end(cache_key)
+                return self._record_run(alert_objects, client, cached[1], start_ns)
             
-            # Combine strand results
-            combined_prediction = self._combine_strand_results(
-                strand_results, alert_objects, client
-            )
+            # Concurrent runs over the same alert set share one analysis, so the
+            # strands and the prediction engine run once per alert set
+            in_flight = self._runs_in_flight.get(cache_key)
+            if in_flight is not None:
+                shared = await asyncio.shield(in_flight)
+                return self._record_run(alert_objects, client, shared, start_ns)
+            
+            future = asyncio.get_running_loop().create_future()
+            self._runs_in_flight[cache_key] = future
+            try:
+                combined_prediction, strand_results = await self._analyze_alerts(
+                    alert_objects, alert_arrays, client, historical_data
+                )
+            except BaseException as e:
+                if isinstance(e, asyncio.CancelledError):
+                    future.cancel()
+                else:
+                    future.set_exception(e)
+                    future.exception()  # waiters re-raise it; don't warn if there are none
+                raise
+            finally:
+                del self._runs_in_flight[cache_key]
+            
+            snapshot = (copy.deepcopy(combined_prediction), strand_results)
+            self._run_cache[cache_key] = (time.monotonic(), snapshot)
+            self._run_cache.move_to_end(cache_key)
+            while len(self._run_cache) > self.RUN_CACHE_SIZE:
+                self._run_cache.popitem(last=False)
+            future.set_result(snapshot)
             
             # Update agent memory and performance
             self._update_agent_memory(alert_objects, combined_prediction, client.id)
-            self._update_performance_metrics(strand_results, start_time)
+            self._update_performance_metrics(strand_results, start_ns)
             
             return combined_prediction
             
         except Exception as e:
-            logger.error(f"Strands Agent failed: {e}")
-            import traceback
-            logger.error(f"Full traceback: {traceback.format_exc()}")
+            # The handler renders the traceback only if the record is emitted
+            logger.exception(f"Strands Agent failed: {e}")
             return self._fallback_prediction(correlated_data)
     
-    def _normalize_alerts(self, alerts: List[Any], client: Client) -> List[Alert]:
-        """Convert alerts to consistent Alert objects"""
+    async def _analyze_alerts(
+        self, 
+        alert_objects: List[Alert], 
+        alert_arrays: Dict[str, np.ndarray], 
+        client: Client, 
+        historical_data: List[Dict]
+    ) -> Tuple[Dict[str, Any], List[StrandResult]]:
+        """Run the analysis strands and combine them; returns the prediction and strand results"""
+        # Define analysis strands
+        strands = [
+            (StrandType.TEMPORAL, self._temporal_analysis_strand),
+            (StrandType.DEPENDENCY, self._dependency_analysis_strand),
+            (StrandType.RESOURCE, self._resource_analysis_strand),
+            (StrandType.PATTERN, self._pattern_analysis_strand),
+            (StrandType.CROSS_CLIENT, self._cross_client_analysis_strand),
+            (StrandType.PREDICTIVE, self._predictive_analysis_strand)
+        ]
+        
+        if self.fuse_strands:
+            # Strands share their inputs and each runs briefly, so one worker
+            # task running them back to back beats a round-trip per strand
+            strand_results = await asyncio.to_thread(
+                self._run_strands_fused, 
+                strands, 
+                alert_objects, 
+                alert_arrays, 
+                client, 
+                historical_data
+            )
+        else:
+            # Execute strands in parallel
+            strand_results = await self._execute_strands_parallel(
+                strands, alert_objects, alert_arrays, client, historical_data
+            )
+        
+        # Combine strand results
+        combined_prediction = self._combine_strand_results(
+            strand_results, alert_objects, client
+        )
+        
+        return combined_prediction, strand_results
+    
+    def _record_run(
+        self, 
+        alerts: List[Alert], 
+        client: Client, 
+        snapshot: Tuple[Dict[str, Any], List[StrandResult]], 
+        start_ns: int
+    ) -> Dict[str, Any]:
+        """Return a copy of a cached or shared analysis, counting it like a fresh run"""
+        prediction = copy.deepcopy(snapshot[0])
+        self._update_agent_memory(alerts, prediction, client.id)
+        self._update_performance_metrics(snapshot[1], start_ns)
+        return prediction
+    
+    def _normalize_alerts(
+        self, alerts: List[Any], client: Client
+    ) -> Tuple[List[Alert], Dict[str, np.ndarray]]:
+        """Convert alerts to consistent Alert objects plus column arrays shared by the strands"""
         normalized_alerts = []
         
         for alert in alerts:
@@ -132,12 +261,10 @@ class StrandsAgent:
                     client_id=alert.get("client_id", client.id),
                     client_name=alert.get("client_name", client.name),
                     system=alert.get("system", "unknown"),
-                    severity=SeverityLevel(alert.get("severity", "info")),
+                    severity=SEVERITY_LEVELS.get(alert.get("severity"), SeverityLevel.INFO),
                     message=alert.get("message", "No message"),
-                    category=AlertCategory(alert.get("category", "system")),
-                    timestamp=datetime.fromisoformat(
-                        alert.get("timestamp", datetime.now().isoformat()).replace('Z', '+00:00')
-                    ),
+                    category=ALERT_CATEGORIES.get(alert.get("category"), AlertCategory.SYSTEM),
+                    timestamp=self._parse_timestamp(alert.get("timestamp")),
                     cascade_risk=alert.get("cascade_risk", 0.0),
                     is_correlated=alert.get("is_correlated", False)
                 )
@@ -146,12 +273,63 @@ class StrandsAgent:
                 # Already an Alert object
                 normalized_alerts.append(alert)
         
-        return normalized_alerts
+        # Systems are interned per run; codes index "system_names" in first-seen order
+        system_codes: Dict[str, int] = {}
+        alert_arrays = {
+            "severity": np.fromiter(
+                (SEVERITY_CODES[a.severity] for a in normalized_alerts),
+                dtype=np.int8, count=len(normalized_alerts)
+            ),
+            "category": np.fromiter(
+                (CATEGORY_CODES[a.category] for a in normalized_alerts),
+                dtype=np.int8, count=len(normalized_alerts)
+            ),
+            "system": np.fromiter(
+                (system_codes.setdefault(a.system, len(system_codes)) for a in normalized_alerts),
+                dtype=np.int32, count=len(normalized_alerts)
+            ),
+            "timestamp": np.fromiter(
+                (a.timestamp.timestamp() for a in normalized_alerts),
+                dtype=np.float64, count=len(normalized_alerts)
+            )
+        }
+        alert_arrays["system_names"] = np.array(list(system_codes), dtype=object)
+        # One clock read per run; every strand measures alert age against it
+        alert_arrays["age_minutes"] = (time.time() - alert_arrays["timestamp"]) / 60
+        
+        return normalized_alerts, alert_arrays
+    
+    @staticmethod
+    def _parse_timestamp(value: Any) -> datetime:
+        """Parse an ISO timestamp, passing datetimes through and defaulting to now"""
+        if value is None:
+            return datetime.now()
+        if isinstance(value, datetime):
+            return value
+        if value.endswith('Z'):
+            value = value[:-1] + '+00:00'
+        return datetime.fromisoformat(value)
+    
+    def _run_cache_key(self, alerts: List[Alert], client: Client, historical_data: List[Dict]) -> bytes:
+        """Digest of the alert set (order-independent), client and historical incidents"""
+        fingerprints = sorted(
+            f"{a.id}\x1f{a.timestamp.isoformat()}\x1f{a.severity.value}\x1f{a.system}\x1f{a.message}"
+            for a in alerts
+        )
+        digest = hashlib.blake2b(client.id.encode(), digest_size=16)
+        for fingerprint in fingerprints:
+            digest.update(b"\x1e")
+            digest.update(fingerprint.encode())
+        # The cross-client strand reads the history, so different history is a different run
+        digest.update(b"\x1d")
+        digest.update(json.dumps(historical_data or [], sort_keys=True, default=str).encode())
+        return digest.digest()
     
     async def _execute_strands_parallel(
         self, 
         strands: List[Tuple[StrandType, callable]], 
         alerts: List[Alert], 
+        alert_arrays: Dict[str, np.ndarray], 
         client: Client, 
         historical_data: List[Dict]
     ) -> List[StrandResult]:
@@ -161,7 +339,9 @@ class StrandsAgent:
         tasks = []
         for strand_type, strand_func in strands:
             task = asyncio.create_task(
-                self._execute_single_strand(strand_type, strand_func, alerts, client, historical_data)
+                self._execute_single_strand(
+                    strand_type, strand_func, alerts, alert_arrays, client, historical_data
+                )
             )
             tasks.append(task)
         
@@ -183,24 +363,54 @@ class StrandsAgent:
         strand_type: StrandType, 
         strand_func: callable, 
         alerts: List[Alert], 
+        alert_arrays: Dict[str, np.ndarray], 
         client: Client, 
         historical_data: List[Dict]
     ) -> StrandResult:
         """Execute a single analysis strand"""
-        start_time = datetime.now()
+        # Run strand function in thread pool to avoid blocking
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            self.executor, 
+            self._run_strand, 
+            strand_type, 
+            strand_func, 
+            alerts, 
+            alert_arrays, 
+            client, 
+            historical_data
+        )
+    
+    def _run_strands_fused(
+        self, 
+        strands: List[Tuple[StrandType, callable]], 
+        alerts: List[Alert], 
+        alert_arrays: Dict[str, np.ndarray], 
+        client: Client, 
+        historical_data: List[Dict]
+    ) -> List[StrandResult]:
+        """Run every strand in order on the calling thread"""
+        return [
+            self._run_strand(strand_type, strand_func, alerts, alert_arrays, client, historical_data)
+            for strand_type, strand_func in strands
+        ]
+    
+    def _run_strand(
+        self, 
+        strand_type: StrandType, 
+        strand_func: callable, 
+        alerts: List[Alert], 
+        alert_arrays: Dict[str, np.ndarray], 
+        client: Client, 
+        historical_data: List[Dict]
+    ) -> StrandResult:
+        """Run one strand and time it; failures become zero-confidence results"""
+        start_ns = time.perf_counter_ns()
         
         try:
-            # Run strand function in thread pool to avoid blocking
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(
-                self.executor, 
-                strand_func, 
-                alerts, 
-                client, 
-                historical_data
-            )
+            result = strand_func(alerts, alert_arrays, client, historical_data)
             
-            execution_time = (datetime.now() - start_time).total_seconds() * 1000
+            execution_time = (time.perf_counter_ns() - start_ns) / 1e6
             
             return StrandResult(
                 strand_type=strand_type,
@@ -213,7 +423,7 @@ class StrandsAgent:
             
         except Exception as e:
             logger.error(f"Strand {strand_type.value} execution failed: {e}")
-            execution_time = (datetime.now() - start_time).total_seconds() * 1000
+            execution_time = (time.perf_counter_ns() - start_ns) / 1e6
             
             return StrandResult(
                 strand_type=strand_type,
@@ -227,16 +437,14 @@ class StrandsAgent:
     def _temporal_analysis_strand(
         self, 
         alerts: List[Alert], 
+        alert_arrays: Dict[str, np.ndarray], 
         client: Client, 
         historical_data: List[Dict]
     ) -> Dict[str, Any]:
         """Analyze temporal patterns in alerts"""
         try:
-            current_time = datetime.now()
-            
             # Analyze alert timing patterns
-            alert_times = [alert.timestamp for alert in alerts]
-            time_diffs = [(current_time - t).total_seconds() / 60 for t in alert_times]
+            time_diffs = alert_arrays["age_minutes"]
             
             # Calculate temporal clustering
             if len(time_diffs) > 1:
@@ -246,9 +454,7 @@ class StrandsAgent:
                 temporal_clustering = 0.5
             
             # Analyze severity progression
-            severity_weights = {"critical": 4, "warning": 2, "info": 1, "low": 0.5}
-            severity_scores = [severity_weights.get(alert.severity.value, 1) for alert in alerts]
-            severity_progression = np.mean(severity_scores) / 4.0
+            severity_progression = SEVERITY_WEIGHTS[alert_arrays["severity"]].mean() / 4.0
             
             # Calculate temporal risk
             temporal_risk = (temporal_clustering * 0.6) + (severity_progression * 0.4)
@@ -275,7 +481,7 @@ class StrandsAgent:
                 "reasoning": f"Temporal analysis shows {temporal_clustering:.2f} clustering factor and {severity_progression:.2f} severity progression",
                 "metadata": {
                     "alert_count": len(alerts),
-                    "time_span_minutes": max(time_diffs) - min(time_diffs) if time_diffs else 0,
+                    "time_span_minutes": float(np.ptp(time_diffs)) if len(time_diffs) else 0,
                     "analysis_type": "temporal_patterns"
                 }
             }
@@ -292,24 +498,23 @@ class StrandsAgent:
     def _dependency_analysis_strand(
         self, 
         alerts: List[Alert], 
+        alert_arrays: Dict[str, np.ndarray], 
         client: Client, 
         historical_data: List[Dict]
     ) -> Dict[str, Any]:
         """Analyze system dependencies and cascade paths"""
         try:
             # Get affected systems from alerts
-            affected_systems = list(set([alert.system for alert in alerts]))
+            affected_systems = alert_arrays["system_names"].tolist()
             
             # Analyze dependency chains
             dependency_risk = 0.0
             cascade_paths = []
             
+            dependents = dependents_index(client.system_dependencies)
             for system in affected_systems:
                 # Get systems that depend on this system
-                dependent_systems = []
-                for sys, deps in client.system_dependencies.items():
-                    if system in deps:
-                        dependent_systems.append(sys)
+                dependent_systems = dependents.get(system, [])
                 
                 # Calculate dependency risk
                 if dependent_systems:
@@ -318,6 +523,7 @@ class StrandsAgent:
             
             # Normalize dependency risk
             dependency_risk = min(1.0, dependency_risk)
+            unique_paths = list(dict.fromkeys(cascade_paths))
             
             # Predict cascade based on dependencies
             if dependency_risk > 0.6:
@@ -335,10 +541,10 @@ class StrandsAgent:
                 "prediction": {
                     "predicted_in": int(predicted_time),
                     "dependency_risk": dependency_risk,
-                    "cascade_paths": list(set(cascade_paths)),
+                    "cascade_paths": unique_paths,
                     "affected_systems": affected_systems
                 },
-                "reasoning": f"Dependency analysis shows {dependency_risk:.2f} risk with {len(set(cascade_paths))} potential cascade paths",
+                "reasoning": f"Dependency analysis shows {dependency_risk:.2f} risk with {len(unique_paths)} potential cascade paths",
                 "metadata": {
                     "systems_analyzed": len(affected_systems),
                     "dependency_chains": len(cascade_paths),
@@ -358,37 +564,27 @@ class StrandsAgent:
     def _resource_analysis_strand(
         self, 
         alerts: List[Alert], 
+        alert_arrays: Dict[str, np.ndarray], 
         client: Client, 
         historical_data: List[Dict]
     ) -> Dict[str, Any]:
         """Analyze resource exhaustion patterns"""
         try:
             # Analyze alert categories for resource indicators
-            resource_categories = {
-                "performance": 0.8,
-                "system": 0.6,
-                "storage": 0.7,
-                "network": 0.5,
-                "application": 0.4
-            }
-            
-            resource_risk = 0.0
-            resource_indicators = []
+            alert_risks = np.empty(len(alerts))
+            resource_risk = _weighted_risk_kernel(
+                alert_arrays["severity"], alert_arrays["category"],
+                SEVERITY_FACTORS, CATEGORY_RISK, alert_risks
+            )
             
-            for alert in alerts:
-                category_risk = resource_categories.get(alert.category.value, 0.3)
-                severity_multiplier = {"critical": 1.0, "warning": 0.7, "info": 0.4, "low": 0.2}
-                severity_factor = severity_multiplier.get(alert.severity.value, 0.3)
-                
-                alert_risk = category_risk * severity_factor
-                resource_risk += alert_risk
-                
-                if alert_risk > 0.5:
-                    resource_indicators.append({
-                        "system": alert.system,
-                        "category": alert.category.value,
-                        "risk": alert_risk
-                    })
+            resource_indicators = [
+                {
+                    "system": alerts[index].system,
+                    "category": alerts[index].category.value,
+                    "risk": float(alert_risks[index])
+                }
+                for index in np.flatnonzero(alert_risks > 0.5)
+            ]
             
             # Normalize resource risk
             resource_risk = min(1.0, resource_risk / len(alerts)) if alerts else 0.0
@@ -432,6 +628,7 @@ class StrandsAgent:
     def _pattern_analysis_strand(
         self, 
         alerts: List[Alert], 
+        alert_arrays: Dict[str, np.ndarray], 
         client: Client, 
         historical_data: List[Dict]
     ) -> Dict[str, Any]:
@@ -489,6 +686,7 @@ class StrandsAgent:
     def _cross_client_analysis_strand(
         self, 
         alerts: List[Alert], 
+        alert_arrays: Dict[str, np.ndarray], 
         client: Client, 
         historical_data: List[Dict]
     ) -> Dict[str, Any]:
@@ -497,14 +695,15 @@ class StrandsAgent:
             # Analyze historical data for similar patterns
             similar_incidents = []
             
+            # Distinct categories and severities of the current alerts, from their codes
+            current_categories = [CATEGORY_NAMES[code] for code in np.unique(alert_arrays["category"])]
+            current_severities = [SEVERITY_NAMES[code] for code in np.unique(alert_arrays["severity"])]
+            
             for incident in historical_data:
                 # Check for similar alert categories and severities
                 incident_categories = incident.get("alert_category", "")
                 incident_severity = incident.get("severity", "")
                 
-                current_categories = [alert.category.value for alert in alerts]
-                current_severities = [alert.severity.value for alert in alerts]
-                
                 # Calculate similarity
                 category_match = any(cat in incident_categories for cat in current_categories)
                 severity_match = any(sev in incident_severity for sev in current_severities)
@@ -514,8 +713,9 @@ class StrandsAgent:
             
             # Calculate cross-client insights
             if similar_incidents:
-                avg_cascade_time = np.mean([inc.get("cascade_time_minutes", 15) for inc in similar_incidents])
-                avg_resolution_time = np.mean([inc.get("resolution_time_minutes", 30) for inc in similar_incidents])
+                # Plain sums: these lists are a handful of incidents, too small for NumPy to pay off
+                avg_cascade_time = sum(inc.get("cascade_time_minutes", 15) for inc in similar_incidents) / len(similar_incidents)
+                avg_resolution_time = sum(inc.get("resolution_time_minutes", 30) for inc in similar_incidents) / len(similar_incidents)
                 success_rate = len([inc for inc in similar_incidents if inc.get("prevention_successful", False)]) / len(similar_incidents)
                 
                 # Predict based on cross-client data
@@ -567,6 +767,7 @@ class StrandsAgent:
     def _predictive_analysis_strand(
         self, 
         alerts: List[Alert], 
+        alert_arrays: Dict[str, np.ndarray], 
         client: Client, 
         historical_data: List[Dict]
     ) -> Dict[str, Any]:
@@ -575,10 +776,10 @@ class StrandsAgent:
             # Combine multiple factors for predictive analysis
             factors = {
                 "alert_density": len(alerts) / 10.0,  # Normalize to 0-1
-                "severity_weight": sum({"critical": 4, "warning": 2, "info": 1, "low": 0.5}.get(a.severity.value, 1) for a in alerts) / (len(alerts) * 4),
-                "system_diversity": len(set(a.system for a in alerts)) / 5.0,  # Normalize to 0-1
-                "category_risk": sum({"performance": 0.8, "system": 0.6, "storage": 0.7, "network": 0.5, "application": 0.4}.get(a.category.value, 0.3) for a in alerts) / len(alerts),
-                "temporal_clustering": self._calculate_temporal_clustering(alerts)
+                "severity_weight": float(SEVERITY_WEIGHTS[alert_arrays["severity"]].sum()) / (len(alerts) * 4),
+                "system_diversity": len(alert_arrays["system_names"]) / 5.0,  # Normalize to 0-1
+                "category_risk": float(CATEGORY_RISK[alert_arrays["category"]].sum()) / len(alerts),
+                "temporal_clustering": self._calculate_temporal_clustering(alert_arrays)
             }
             
             # Weighted prediction model
@@ -633,14 +834,12 @@ class StrandsAgent:
                 "metadata": {"error": str(e)}
             }
     
-    def _calculate_temporal_clustering(self, alerts: List[Alert]) -> float:
+    def _calculate_temporal_clustering(self, alert_arrays: Dict[str, np.ndarray]) -> float:
         """Calculate temporal clustering factor"""
-        if len(alerts) < 2:
+        time_diffs = alert_arrays["age_minutes"]
+        if len(time_diffs) < 2:
             return 0.5
         
-        current_time = datetime.now()
-        time_diffs = [(current_time - alert.timestamp).total_seconds() / 60 for alert in alerts]
-        
         if len(time_diffs) > 1:
             time_variance = np.var(time_diffs)
             clustering = 1.0 / (1.0 + time_variance / 60)
@@ -669,10 +868,13 @@ class StrandsAgent:
             StrandType.CROSS_CLIENT: 0.10
         }
         
-        # Calculate weighted predictions
+        # Calculate weighted predictions and the run summary in one pass
         weighted_confidence = 0.0
         weighted_time = 0.0
         total_weight = 0.0
+        confidence_sum = 0.0
+        execution_time_ms = 0.0
+        strands_used = []
         
         strand_insights = []
         all_affected_systems = set()
@@ -682,16 +884,20 @@ class StrandsAgent:
             weight = strand_weights.get(result.strand_type, 0.1)
             confidence = result.confidence
             prediction = result.prediction
+            strand_name = result.strand_type.value
+            strands_used.append(strand_name)
+            execution_time_ms += result.execution_time_ms
             
             if confidence > 0:
                 weighted_confidence += confidence * weight
                 predicted_time = prediction.get("predicted_in", 20)
                 weighted_time += predicted_time * weight * confidence
                 total_weight += weight * confidence
+                confidence_sum += confidence
                 
                 # Collect insights
                 strand_insights.append({
-                    "strand_type": result.strand_type.value,
+                    "strand_type": strand_name,
                     "confidence": confidence,
                     "reasoning": result.reasoning,
                     "execution_time_ms": result.execution_time_ms,
@@ -742,17 +948,17 @@ class StrandsAgent:
             "pattern": "strands_agent_analysis",
             "strand_analysis": {
                 "strands_executed": len(strand_results),
-                "strands_successful": len([r for r in strand_results if r.confidence > 0]),
+                "strands_successful": len(strand_insights),
                 "strand_insights": strand_insights,
-                "execution_time_ms": sum(r.execution_time_ms for r in strand_results),
-                "average_confidence": np.mean([r.confidence for r in strand_results if r.confidence > 0]) if strand_results else 0
+                "execution_time_ms": execution_time_ms,
+                "average_confidence": confidence_sum / len(strand_insights) if strand_insights else 0
             },
             "agent_metadata": {
                 "agent_name": self.name,
                 "analysis_timestamp": datetime.now().isoformat(),
-                "strands_used": [r.strand_type.value for r in strand_results],
-                "total_execution_time_ms": sum(r.execution_time_ms for r in strand_results),
-                "parallel_execution": True
+                "strands_used": strands_used,
+                "total_execution_time_ms": execution_time_ms,
+                "parallel_execution": not self.fuse_strands
             }
         }
     
@@ -768,13 +974,16 @@ class StrandsAgent:
             "strands_used": prediction.get("strand_analysis", {}).get("strands_executed", 0)
         }
         
+        # Bounded ring buffer: the oldest record is dropped once it is full
         self.incident_memory.append(incident_record)
-        
-        # Keep memory size manageable
-        if len(self.incident_memory) > 1000:
-            self.incident_memory = self.incident_memory[-800:]
     
-    def _update_performance_metrics(self, strand_results: List[StrandResult], start_time: datetime):
+    def recent_incidents(self, limit: int = 5) -> List[Dict[str, Any]]:
+        """Most recent incident records, oldest first"""
+        recent = list(islice(reversed(self.incident_memory), max(limit, 0)))
+        recent.reverse()
+        return recent
+    
+    def _update_performance_metrics(self, strand_results: List[StrandResult], start_ns: int):
         """Update performance metrics"""
         self.performance_metrics["total_analyses"] += 1
         
@@ -788,14 +997,12 @@ class StrandsAgent:
             if result.confidence > 0:
                 self.strand_performance[strand_type]["successful"] += 1
         
-        # Update average execution time
-        total_time = (datetime.now() - start_time).total_seconds() * 1000
+        # Update average execution time (incremental mean)
+        total_time = (time.perf_counter_ns() - start_ns) / 1e6
         current_avg = self.performance_metrics["average_execution_time_ms"]
         total_analyses = self.performance_metrics["total_analyses"]
         
-        self.performance_metrics["average_execution_time_ms"] = (
-            (current_avg * (total_analyses - 1) + total_time) / total_analyses
-        )
+        self.performance_metrics["average_execution_time_ms"] += (total_time - current_avg) / total_analyses
         
         # Update success rate
         successful_analyses = len([r for r in strand_results if r.confidence > 0])
@@ -810,10 +1017,10 @@ class StrandsAgent:
         # Handle both Alert objects and dictionaries
         if alerts and isinstance(alerts[0], dict):
             critical_count = len([a for a in alerts if a.get("severity") == "critical"])
-            avg_cascade_risk = sum(a.get("cascade_risk", 0) for a in alerts) / len(alerts) if alerts else 0
+            avg_cascade_risk = fmean(a.get("cascade_risk", 0) for a in alerts) if alerts else 0
         else:
-            critical_count = len([a for a in alerts if a.severity == "critical"])
-            avg_cascade_risk = sum(a.cascade_risk for a in alerts) / len(alerts) if alerts else 0
+            critical_count = sum(1 for a in alerts if a.severity is SeverityLevel.CRITICAL)
+            avg_cascade_risk = fmean(a.cascade_risk for a in alerts) if alerts else 0
         
         return {
             "predicted_in": 20,
@@ -838,7 +1045,9 @@ class StrandsAgent:
             "agent_name": self.name,
             "agent_created": self.created_at.isoformat(),
             "max_workers": self.max_workers,
+            "fuse_strands": self.fuse_strands,
             "memory_size": len(self.incident_memory),
+            "run_cache_size": len(self._run_cache),
             "performance_metrics": self.performance_metrics,
             "strand_performance": self.strand_performance,
             "strands_available": [strand_type.value for strand_type in StrandType],
@@ -847,9 +1056,9 @@ class StrandsAgent:
     
     def __del__(self):
         """Cleanup thread pool"""
-        if hasattr(self, 'executor'):
+        if getattr(self, 'executor', None) is not None:
             self.executor.shutdown(wait=False)
 
-def create_strands_agent(max_workers: int = 6) -> StrandsAgent:
+def create_strands_agent(max_workers: int = 6, fuse_strands: bool = True) -> StrandsAgent:
     """Factory function to create StrandsAgent instances"""
-    return StrandsAgent(max_workers=max_workers)
+    return StrandsAgent(max_workers=max_workers, fuse_strands=fuse_strands)